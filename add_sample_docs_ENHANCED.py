@@ -1,7 +1,11 @@
 from app.core.database import SessionLocal
 from app.models.document import Document
-from sentence_transformers import SentenceTransformer
+from app.rag.document_loader import bulk_load_documents, MODE_DIFF
+from app.rag.embedding_store import get_ingestion_embeddings
+from app.rag.dedup import find_near_duplicates
+from app.core.config import settings
 import logging
+import time
 
 logging.basicConfig(
     level=logging.INFO,
@@ -9,10 +13,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+model = get_ingestion_embeddings()
 
 
-def add_btc_hospital_data():
+def add_btc_hospital_data(mode: str = MODE_DIFF):
     db = SessionLocal()
 
     logger.info("=" * 80)
@@ -22,15 +26,8 @@ def add_btc_hospital_data():
     try:
         count = db.query(Document).count()
         logger.info(f"Found {count} existing documents")
-
-        db.query(Document).delete()
-        db.commit()
-        logger.info("Documents cleared")
-    except Exception:
-        logger.exception("Failed to clear documents")
-        db.rollback()
+    finally:
         db.close()
-        return
 
     documents = [
         # ═══════════════════════════════════════════════════════
@@ -548,25 +545,38 @@ def add_btc_hospital_data():
         "Electronic health records system ensures privacy and security of patient information.",
     ]
 
+    if settings.DEDUP_ENABLED:
+        kept, duplicate_of = find_near_duplicates(documents, max_distance=settings.DEDUP_MAX_DISTANCE)
+        for duplicate, canonical in duplicate_of.items():
+            logger.info(f"Near-duplicate collapsed: #{duplicate + 1} -> #{canonical + 1}: {documents[duplicate][:80]}")
+        total_documents = len(documents)
+        documents = [documents[i] for i in kept]
+    else:
+        duplicate_of = {}
+        total_documents = len(documents)
+
     logger.info("Generating embeddings...")
-    embeddings = model.encode(documents, show_progress_bar=True)
-
-    for i, (content, embedding) in enumerate(zip(documents, embeddings), start=1):
-        try:
-            doc = Document(
-                content=content,
-                embedding=embedding.tolist()
-            )
-            db.add(doc)
-            logger.info(f"Inserted document {i}")
-        except Exception:
-            logger.exception(f"Failed on document {i}")
-            db.rollback()
-            db.close()
-            return
-
-    db.commit()
-    db.close()
+    start = time.perf_counter()
+    embeddings = model.embed_documents(documents)
+    seconds_per_document = (time.perf_counter() - start) / max(len(documents), 1)
+
+    if duplicate_of:
+        logger.info(
+            f"Dedup: {len(duplicate_of)}/{total_documents} near-duplicates dropped, "
+            f"saving {len(duplicate_of) * settings.EMBEDDING_DIMENSION * 4} vector bytes per index "
+            f"and ~{len(duplicate_of) * seconds_per_document:.2f}s of embedding time"
+        )
+
+    try:
+        stats = bulk_load_documents(documents, embeddings, mode=mode, source="btc_hospital_sample")
+    except Exception:
+        logger.exception("Bulk load failed, existing documents left unchanged")
+        return
+
+    logger.info(
+        f"Loaded ({mode}): {stats['claimed']} legacy rows claimed, {stats['inserted']} inserted, "
+        f"{stats['updated']} updated, {stats['deleted']} deleted"
+    )
 
     logger.info("=" * 80)
     logger.info(f"BTC HOSPITAL BOSTON DATABASE COMPLETE - {len(documents)} DOCUMENTS ADDED")
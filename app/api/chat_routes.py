@@ -1,16 +1,22 @@
 from fastapi import APIRouter, HTTPException, Depends, Security
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
+from app.core.config import settings
 from app.models.user import User
 from app.models.chat import Chat
 from datetime import datetime, timedelta
+import asyncio
 import hashlib
+import json
+import time
 import uuid
-import os
 from dotenv import load_dotenv
 from app.core.jwt_auth import create_access_token, verify_token
+from app.core.llm import ainvoke_chat, astream_chat
 
 load_dotenv(override=True)
 
@@ -310,150 +316,219 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(
-        request: ChatRequest,
-        db: Session = Depends(get_db),
-        current_user: dict = Depends(get_current_user)
-):
+SIMPLE_ACKNOWLEDGMENTS = [
+    "ok", "okay", "thanks", "thank you", "yes", "no", "nope",
+    "yep", "sure", "alright", "fine", "got it", "understood",
+    "cool", "good", "great", "perfect", "nice", "yeah", "nah",
+    "i see", "i understand", "i know"
+]
+
+CONSENT_KEYWORDS = [
+    "agree", "consent", "accept", "yes", "ok", "ha",
+    "सहमत", "सहमति", "स्वीकार", "हाँ", "हां"
+]
+
+
+class ChatTurn:
+    # Everything a reply needs once the blocking preparation is done: either a ready response
+    # (cache hit, fixed message) or a prompt for the LLM
+    def __init__(self, memory=None, prompt=None, response=None, rag=None, cacheable=False, clarify=False):
+        self.memory = memory
+        self.prompt = prompt
+        self.response = response
+        self.rag = rag
+        self.cacheable = cacheable
+        self.clarify = clarify
+
+
+class Speculation:
+    # What the speculative stage produced ahead of the intent; None means "not available, do it now"
+    def __init__(self, memory=None, scored_docs=None, cached_response=None, cache_checked=False):
+        self.memory = memory
+        self.scored_docs = scored_docs
+        self.cached_response = cached_response
+        self.cache_checked = cache_checked
+
+
+def load_memory(db: Session, user_id: str):
+    from app.memory.langchain_batch_memory import LangChainBatchMemory
+
+    memory = LangChainBatchMemory(
+        db=db,
+        user_id=user_id,
+        batch_size=6,
+        cache_minutes=2
+    )
+    memory.load_from_database()
+    return memory
+
+
+def load_memory_detached(db: Session, user_id: str):
+    # Loaded on a session of its own, since the request session is busy with intent overrides
+    # at the same time; the memory only holds plain values, so it is handed back to `db` afterwards
+    load_db = SessionLocal()
     try:
-        print("=" * 60)
-        print(" CHAT REQUEST RECEIVED (JWT + LangChain + Batch Memory)")
-        print("=" * 60)
-        print(f" User ID: {current_user['sub']}")
-        print(f" User Name: {current_user['name']}")
-        print(f" Message: {request.message}")
-        print(f" Language: {request.language}")
-        print("=" * 60)
+        memory = load_memory(load_db, user_id)
+    finally:
+        load_db.close()
+    memory.db = db
+    return memory
 
-        user_id = current_user["sub"]
-        language = request.language if request.language in TRANSLATIONS else "en"
-        t = TRANSLATIONS[language]
 
-        total_messages = db.query(Chat).filter(Chat.user_id == user_id).count()
-        print(f" Total messages so far: {total_messages}")
+def speculative_retrieve(message: str):
+    from app.rag.langchain_rag_FINAL import get_rag_pipeline, is_rag_ready
 
-        from app.logic.consent_manager import has_active_consent, record_consent
+    # Never let a speculative search be the thing that loads the pipeline
+    if not is_rag_ready():
+        return None
+    return get_rag_pipeline().retrieve(message)
 
-        has_user_consented = has_active_consent(db, user_id)
 
-        if not has_user_consented:
-            message_lower = request.message.lower().strip()
-            consent_keywords = [
-                "agree", "consent", "accept", "yes", "ok", "ha",
-                "सहमत", "सहमति", "स्वीकार", "हाँ", "हां"
-            ]
-            has_consent_in_message = any(keyword in message_lower for keyword in consent_keywords)
+def speculative_cache_lookup(message: str, language: str):
+    from app.rag.langchain_rag_FINAL import get_rag_pipeline, is_rag_ready
 
-            if not has_consent_in_message:
-                print(f" Consent not yet provided - asking again")
-                response = t["consent_prompt"]
-                save_chat_message(db, user_id, request.session_id, request.message, response)
-                return ChatResponse(response=response, session_id=request.session_id)
-            else:
-                print(f" Consent provided!")
-                record_consent(db, user_id)
-                response = t["consent_confirmed"]
-                save_chat_message(db, user_id, request.session_id, request.message, response)
-                return ChatResponse(response=response, session_id=request.session_id)
-
-        print(f" Message #{total_messages + 1} - Classifying intent...")
-
-        from app.logic.intent_classifier_advanced import classify_intent, get_clarification_question
-        from app.logic.chat_history_loader import load_chat_history
-
-        history = load_chat_history(db, user_id)
-        message_lower = request.message.lower().strip()
-        simple_acknowledgments = [
-            "ok", "okay", "thanks", "thank you", "yes", "no", "nope",
-            "yep", "sure", "alright", "fine", "got it", "understood",
-            "cool", "good", "great", "perfect", "nice", "yeah", "nah",
-            "i see", "i understand", "i know"
-        ]
+    if not is_rag_ready():
+        return None, False
+    return get_rag_pipeline().get_cached_answer(message, language), True
 
-        if message_lower in simple_acknowledgments:
-            intent = "GENERAL_CHAT"
-            print(f" Auto-classified as GENERAL_CHAT (simple acknowledgment)")
-        else:
-            intent = classify_intent(request.message)
-            print(f" Intent: {intent}")
-
-        if message_lower.isdigit():
-            choice = int(message_lower)
-            if choice == 1:
-                last_intent = get_last_message_intent(db, user_id)
-                if last_intent == "MEDICAL":
-
-                    intent = "MEDICAL"
-                    print(f" User selected Medical (from clarification, previous was MEDICAL) - forcing MEDICAL")
-                else:
-                    intent = "MEDICAL"
-                    print(f" User selected Medical (from clarification)")
-            elif choice == 2:
-                intent = "OTHER"
-                print(f" User selected Information about me - overriding intent")
-            else:
-                intent = "OTHER"
-                print(f" User selected Something else - overriding intent")
 
-        follow_up_keywords = [
-            "what to do", "how to", "what should", "should i", "can i",
-            "above", "that", "same", "those", "this", "it", "that one",
-            "it is", "it's", "that problem", "that issue", "already"
-        ]
+def discard_task(task: asyncio.Future, reason: str):
+    # The threadpool cannot interrupt a running search, so it finishes detached and its result is dropped
+    print(f" Not waiting for speculative retrieval ({reason})")
+    task.add_done_callback(lambda finished: finished.cancelled() or finished.exception())
 
-        if intent == "AMBIGUOUS" and message_lower.startswith("what to do"):
-            last_intent = get_last_message_intent(db, user_id)
-            if last_intent == "MEDICAL":
-                intent = "MEDICAL"
-                print(f" Context-aware: Follow-up to medical question → forcing MEDICAL")
 
-        if intent == "AMBIGUOUS" and any(
-                keyword in message_lower for keyword in ["already said", "said above", "above", "same"]):
+def consent_gate(db: Session, user_id: str, request: ChatRequest, t: dict):
+    from app.logic.consent_manager import has_active_consent, record_consent
+
+    total_messages = db.query(Chat).filter(Chat.user_id == user_id).count()
+    print(f" Total messages so far: {total_messages}")
+
+    if has_active_consent(db, user_id):
+        return None
+
+    message_lower = request.message.lower().strip()
+    has_consent_in_message = any(keyword in message_lower for keyword in CONSENT_KEYWORDS)
+
+    if not has_consent_in_message:
+        print(f" Consent not yet provided - asking again")
+        response = t["consent_prompt"]
+    else:
+        print(f" Consent provided!")
+        record_consent(db, user_id)
+        response = t["consent_confirmed"]
+
+    save_chat_message(db, user_id, request.session_id, request.message, response)
+    return response
+
+
+def apply_intent_overrides(db: Session, user_id: str, message_lower: str, intent: str) -> str:
+    if message_lower.isdigit():
+        choice = int(message_lower)
+        if choice == 1:
             last_intent = get_last_message_intent(db, user_id)
             if last_intent == "MEDICAL":
+
                 intent = "MEDICAL"
-                print(f" Context-aware: Reference to previous medical question → forcing MEDICAL")
+                print(f" User selected Medical (from clarification, previous was MEDICAL) - forcing MEDICAL")
+            else:
+                intent = "MEDICAL"
+                print(f" User selected Medical (from clarification)")
+        elif choice == 2:
+            intent = "OTHER"
+            print(f" User selected Information about me - overriding intent")
+        else:
+            intent = "OTHER"
+            print(f" User selected Something else - overriding intent")
 
-        if USE_LANGCHAIN:
-            from langchain_groq import ChatGroq
-            from app.memory.langchain_batch_memory import LangChainBatchMemory
-            from app.rag.langchain_rag_FINAL import get_rag_pipeline
+    if intent == "AMBIGUOUS" and message_lower.startswith("what to do"):
+        last_intent = get_last_message_intent(db, user_id)
+        if last_intent == "MEDICAL":
+            intent = "MEDICAL"
+            print(f" Context-aware: Follow-up to medical question → forcing MEDICAL")
 
-            if intent == "MEDICAL":
-                print(f" MEDICAL: Using LangChain RAG with Batch Summarization Memory")
+    if intent == "AMBIGUOUS" and any(
+            keyword in message_lower for keyword in ["already said", "said above", "above", "same"]):
+        last_intent = get_last_message_intent(db, user_id)
+        if last_intent == "MEDICAL":
+            intent = "MEDICAL"
+            print(f" Context-aware: Reference to previous medical question → forcing MEDICAL")
 
-                memory = LangChainBatchMemory(
-                    db=db,
-                    user_id=user_id,
-                    batch_size=6,
-                    cache_minutes=2
-                )
+    return intent
 
-                memory.load_from_database()
 
-                llm = ChatGroq(
-                    model="llama-3.1-8b-instant",
-                    temperature=0.2,
-                    groq_api_key=os.getenv("GROQ_API_KEY")
-                )
+async def resolve_intent(db: Session, user_id: str, message: str) -> str:
+    from app.logic.intent_classifier_advanced import classify_intent_async
 
-                rag = get_rag_pipeline()
-                retriever = rag.vector_store.as_retriever(
-                    search_type="similarity",
-                    search_kwargs={"k": 3}
-                )
-                retrieved_docs = retriever.invoke(request.message)
+    message_lower = message.lower().strip()
+
+    if message_lower in SIMPLE_ACKNOWLEDGMENTS:
+        intent = "GENERAL_CHAT"
+        print(f" Auto-classified as GENERAL_CHAT (simple acknowledgment)")
+    else:
+        intent = await classify_intent_async(message)
+        print(f" Intent: {intent}")
+
+    return await run_in_threadpool(apply_intent_overrides, db, user_id, message_lower, intent)
+
+
+async def speculate_turn(db: Session, user_id: str, message: str, language: str) -> tuple:
+    # Memory, the answer cache and retrieval do not depend on the intent for the common MEDICAL turn,
+    # so they start together with intent classification. Retrieval is only awaited when the turn
+    # needs it: a non-MEDICAL intent or an answer cache hit returns without waiting for the search
+    started = time.perf_counter()
+    speculate_retrieval = settings.SPECULATIVE_RETRIEVAL and message.lower().strip() not in SIMPLE_ACKNOWLEDGMENTS
 
-                print(f" Retrieved {len(retrieved_docs)} documents:")
-                for i, doc in enumerate(retrieved_docs, 1):
-                    print(f"   Doc {i}: {doc.page_content[:100]}...")
+    intent_task = asyncio.ensure_future(resolve_intent(db, user_id, message))
+    memory_task = asyncio.ensure_future(run_in_threadpool(load_memory_detached, db, user_id))
+    cache_task = None
+    retrieval_task = None
+    if speculate_retrieval:
+        cache_task = asyncio.ensure_future(run_in_threadpool(speculative_cache_lookup, message, language))
+        retrieval_task = asyncio.ensure_future(run_in_threadpool(speculative_retrieve, message))
 
-                if not retrieved_docs or len(retrieved_docs) == 0:
-                    print(" No RAG docs found → switching to GENERAL MEDICAL KNOWLEDGE MODE")
+    speculation = Speculation()
+    try:
+        intent = await intent_task
+    except Exception:
+        memory_task.cancel()
+        if retrieval_task is not None:
+            cache_task.cancel()
+            discard_task(retrieval_task, "intent classification failed")
+        raise
+
+    try:
+        speculation.memory = await memory_task
+    except Exception as e:
+        print(f" Speculative memory load failed, loading again: {e}")
+
+    if retrieval_task is not None:
+        if intent != "MEDICAL":
+            cache_task.cancel()
+            discard_task(retrieval_task, intent)
+        else:
+            try:
+                speculation.cached_response, speculation.cache_checked = await cache_task
+            except Exception as e:
+                print(f" Speculative answer cache lookup failed: {e}")
+
+            # Only context-free turns may use a cached answer, see prepare_medical_turn
+            context_free = speculation.memory is not None and not speculation.memory.get_memory_context()
+            if speculation.cached_response is not None and context_free:
+                discard_task(retrieval_task, "answer cache hit")
+            else:
+                try:
+                    speculation.scored_docs = await retrieval_task
+                except Exception as e:
+                    print(f" Speculative retrieval failed, retrieving again: {e}")
 
-                    if language == "hi":
-                        prompt = f"""
+    print(f" Intent and speculative work ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return intent, speculation
+
+
+def medical_fallback_prompt(language: str, memory_context: str, message: str) -> str:
+    if language == "hi":
+        return f"""
                 आप एक सुरक्षित और जिम्मेदार चिकित्सा सहायक हैं।
 
                 नियम:
@@ -464,57 +539,32 @@ async def chat(
                 - गंभीर स्थिति में डॉक्टर से मिलने की सलाह दें
 
                 पिछली बातचीत:
-                {memory.get_memory_context()}
+                {memory_context}
 
                 प्रश्न:
-                {request.message}
+                {message}
 
                 सरल, सुरक्षित और सहायक उत्तर दें।
                 """
-                    else:
-                        prompt = f"""
+    return f"""
                 {MEDICAL_STYLE_PROMPT}
 
                 {ANTI_HALLUCINATION_GUARD}
 
                 Previous conversation context:
-                {memory.get_memory_context()}
+                {memory_context}
 
                 User question:
-                {request.message}
+                {message}
 
                 Give a clear, calm, and helpful response in 4–6 bullet points.
                 End with a medical disclaimer.
                 """
 
-                    response = llm.invoke(prompt)
-                    bot_response = response.content
-
-                    memory.add_message(request.message, bot_response)
-                    memory.save_to_database()
-
-                    save_chat_message(
-                        db,
-                        user_id,
-                        request.session_id,
-                        request.message,
-                        bot_response
-                    )
 
-                    return ChatResponse(
-                        response=bot_response,
-                        session_id=request.session_id
-                    )
-
-                context_docs = "\n\n".join([
-                    f"Document {i}: {doc.page_content}"
-                    for i, doc in enumerate(retrieved_docs, 1)
-                ])
-
-                memory_context = memory.get_memory_context()
-
-                if language == "hi":
-                    prompt = f"""आप एक सहायक चिकित्सा सहायक हैं।
+def medical_context_prompt(language: str, memory_context: str, context_docs: str, message: str) -> str:
+    if language == "hi":
+        return f"""आप एक सहायक चिकित्सा सहायक हैं।
 
 **महत्वपूर्ण निर्देश:**
 - केवल नीचे दिए गए चिकित्सा संदर्भ की जानकारी का उपयोग करें
@@ -527,11 +577,10 @@ async def chat(
 चिकित्सा संदर्भ:
 {context_docs}
 
-प्रश्न: {request.message}
+प्रश्न: {message}
 
 केवल ऊपर दिए गए चिकित्सा संदर्भ के आधार पर उत्तर दें:"""
-                else:
-                    prompt = f"""{MEDICAL_STYLE_PROMPT}
+    return f"""{MEDICAL_STYLE_PROMPT}
 
 
 Use ONLY the medical context below.
@@ -545,49 +594,22 @@ Previous conversation:
 Medical context:
 {context_docs}
 
-Question: {request.message}
+Question: {message}
 
 Answer in bullet points if helpful."""
 
-                print(f"   Calling LangChain LLM (ChatGroq)...")
-                response = llm.invoke(prompt)
-                bot_response = response.content
-                print(f"    LangChain LLM responded")
-
-                memory.add_message(request.message, bot_response)
-                memory.save_to_database()
 
-            elif intent == "GENERAL_CHAT":
-                print(f" GENERAL_CHAT: Using LangChain for friendly response")
-
-                memory = LangChainBatchMemory(
-                    db=db,
-                    user_id=user_id,
-                    batch_size=6,
-                    cache_minutes=2
-                )
-
-                memory.load_from_database()
-
-                llm = ChatGroq(
-                    model="llama-3.1-8b-instant",
-                    temperature=0.2,
-                    groq_api_key=os.getenv("GROQ_API_KEY")
-                )
-
-                memory_context = memory.get_memory_context()
-
-                if language == "hi":
-                    prompt = f"""आप एक चिकित्सा सहायक हैं।
+def general_chat_prompt(language: str, memory_context: str, message: str) -> str:
+    if language == "hi":
+        return f"""आप एक चिकित्सा सहायक हैं।
 
 पिछली बातचीत:
 {memory_context}
 
-प्रश्न: {request.message}
+प्रश्न: {message}
 
 मैत्रीपूर्ण तरीके से जवाब दें।"""
-                else:
-                    prompt = f"""
+    return f"""
                     You are a friendly, calm medical assistant.
 - Be warm and conversational
 - Keep answers short and clear
@@ -596,62 +618,157 @@ Answer in bullet points if helpful."""
 Previous conversation:
 {memory_context}
 
-Question: {request.message}
+Question: {message}
 
 Respond naturally and warmly."""
 
-                print(f"    Calling LangChain LLM (ChatGroq)...")
-                response = llm.invoke(prompt)
-                bot_response = response.content
-                print(f"    LangChain LLM responded")
 
-                memory.add_message(request.message, bot_response)
-                memory.save_to_database()
+def prepare_medical_turn(db: Session, user_id: str, message: str, language: str,
+                         speculation: Speculation = None) -> ChatTurn:
+    from app.rag.langchain_rag_FINAL import get_rag_pipeline
 
-            elif intent == "AMBIGUOUS":
-                print(f" AMBIGUOUS: Using LangChain for clarification")
+    print(f" MEDICAL: Using LangChain RAG with Batch Summarization Memory")
 
-                memory = LangChainBatchMemory(
-                    db=db,
-                    user_id=user_id,
-                    batch_size=6,
-                    cache_minutes=2
-                )
+    speculation = speculation or Speculation()
+    memory = speculation.memory or load_memory(db, user_id)
+    memory_context = memory.get_memory_context()
 
-                memory.load_from_database()
+    rag = get_rag_pipeline()
 
-                clarification = get_clarification_question(request.message)
-                bot_response = t["clarification"].format(question=clarification)
+    # Personalized turns depend on the user's history, so only context-free questions are cached
+    cacheable = not memory_context
+    if cacheable:
+        cached_response = speculation.cached_response
+        if not speculation.cache_checked:
+            cached_response = rag.get_cached_answer(message, language)
+        if cached_response is not None:
+            print(f" Answer cache hit - skipping retrieval and LLM call")
+            return ChatTurn(memory=memory, response=cached_response)
 
-                memory.add_message(request.message, bot_response)
-                memory.save_to_database()
+    scored_docs = speculation.scored_docs
+    if scored_docs is None:
+        scored_docs = rag.retrieve(message)
+    return build_medical_turn(memory, rag, scored_docs, message, language, cacheable)
 
-            else:
-                print(f" OTHER: Using LangChain for non-medical response")
 
-                memory = LangChainBatchMemory(
-                    db=db,
-                    user_id=user_id,
-                    batch_size=6,
-                    cache_minutes=2
-                )
+def build_medical_turn(memory, rag, scored_docs: list, message: str, language: str, cacheable: bool) -> ChatTurn:
+    retrieved_docs = [doc for doc, _ in scored_docs]
+    memory_context = memory.get_memory_context()
 
-                memory.load_from_database()
+    print(f" Retrieved {len(retrieved_docs)} documents above threshold {settings.SIMILARITY_THRESHOLD}:")
+    for i, (doc, score) in enumerate(scored_docs, 1):
+        print(f"   Doc {i} ({score:.3f}): {doc.page_content[:100]}...")
 
-                bot_response = t["not_medical"]
+    if not retrieved_docs:
+        print(" No RAG docs found → switching to GENERAL MEDICAL KNOWLEDGE MODE")
+        prompt = medical_fallback_prompt(language, memory_context, message)
+    else:
+        context_docs = "\n\n".join([
+            f"Document {i}: {doc.page_content}"
+            for i, doc in enumerate(retrieved_docs, 1)
+        ])
+        prompt = medical_context_prompt(language, memory_context, context_docs, message)
+
+    return ChatTurn(memory=memory, prompt=prompt, rag=rag, cacheable=cacheable)
+
+
+def prepare_turn(db: Session, user_id: str, message: str, language: str, t: dict, intent: str,
+                 speculation: Speculation = None) -> ChatTurn:
+    if intent == "MEDICAL":
+        return prepare_medical_turn(db, user_id, message, language, speculation)
+
+    memory = (speculation.memory if speculation else None) or load_memory(db, user_id)
+
+    if intent == "GENERAL_CHAT":
+        print(f" GENERAL_CHAT: Using LangChain for friendly response")
+        return ChatTurn(memory=memory, prompt=general_chat_prompt(language, memory.get_memory_context(), message))
+
+    if intent == "AMBIGUOUS":
+        print(f" AMBIGUOUS: Using LangChain for clarification")
+        return ChatTurn(memory=memory, clarify=True)
+
+    print(f" OTHER: Using LangChain for non-medical response")
+    return ChatTurn(memory=memory, response=t["not_medical"])
+
+
+async def generate_turn_response(turn: ChatTurn, message: str, t: dict) -> str:
+    if turn.response is not None:
+        return turn.response
+
+    if turn.clarify:
+        from app.logic.intent_classifier_advanced import get_clarification_question_async
+
+        clarification = await get_clarification_question_async(message)
+        return t["clarification"].format(question=clarification)
+
+    print(f"   Calling LangChain LLM (ChatGroq)...")
+    response = await ainvoke_chat(turn.prompt)
+    print(f"    LangChain LLM responded")
+    return response
+
+
+def finish_turn(db: Session, user_id: str, request: ChatRequest, language: str, turn: ChatTurn, bot_response: str):
+    if turn.cacheable and turn.rag is not None:
+        turn.rag.cache_answer(request.message, language, bot_response)
+
+    turn.memory.add_message(request.message, bot_response)
+    turn.memory.save_to_database()
+
+    save_chat_message(db, user_id, request.session_id, request.message, bot_response)
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(
+        request: ChatRequest,
+        db: Session = Depends(get_db),
+        current_user: dict = Depends(get_current_user)
+):
+    # Blocking work (SQLAlchemy, embeddings, vector search, summarization) runs in the threadpool
+    # and the LLM calls are awaited, so a slow Groq reply never stalls other conversations
+    try:
+        print("=" * 60)
+        print(" CHAT REQUEST RECEIVED (JWT + LangChain + Batch Memory)")
+        print("=" * 60)
+        print(f" User ID: {current_user['sub']}")
+        print(f" User Name: {current_user['name']}")
+        print(f" Message: {request.message}")
+        print(f" Language: {request.language}")
+        print("=" * 60)
+
+        user_id = current_user["sub"]
+        language = request.language if request.language in TRANSLATIONS else "en"
+        t = TRANSLATIONS[language]
 
-                memory.add_message(request.message, bot_response)
-                memory.save_to_database()
+        consent_response = await run_in_threadpool(consent_gate, db, user_id, request, t)
+        if consent_response is not None:
+            return ChatResponse(response=consent_response, session_id=request.session_id)
+
+        print(f" Classifying intent...")
+
+        if USE_LANGCHAIN:
+            intent, speculation = await speculate_turn(db, user_id, request.message, language)
+            turn = await run_in_threadpool(
+                prepare_turn, db, user_id, request.message, language, t, intent, speculation
+            )
+            bot_response = await generate_turn_response(turn, request.message, t)
+            await run_in_threadpool(finish_turn, db, user_id, request, language, turn, bot_response)
 
         else:
+            from app.logic.chat_history_loader import load_chat_history
             from app.rag.langchain_rag_FINAL import get_rag_response
 
+            intent = await resolve_intent(db, user_id, request.message)
             if intent == "MEDICAL":
-                bot_response = get_rag_response(db, user_id, request.message, history, language)
+                history = await run_in_threadpool(load_chat_history, db, user_id)
+                bot_response = await run_in_threadpool(
+                    get_rag_response, db, user_id, request.message, history, language
+                )
             else:
                 bot_response = t["not_medical"]
 
-        save_chat_message(db, user_id, request.session_id, request.message, bot_response)
+            await run_in_threadpool(
+                save_chat_message, db, user_id, request.session_id, request.message, bot_response
+            )
 
         print(f" Chat response generated successfully")
         return ChatResponse(response=bot_response, session_id=request.session_id)
@@ -665,6 +782,85 @@ Respond naturally and warmly."""
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+        request: ChatRequest,
+        current_user: dict = Depends(get_current_user)
+):
+    # The session outlives this handler: it is closed by the stream once the reply is persisted
+    db = SessionLocal()
+    user_id = current_user["sub"]
+    language = request.language if request.language in TRANSLATIONS else "en"
+    t = TRANSLATIONS[language]
+    started = time.perf_counter()
+
+    print("=" * 60)
+    print(" STREAMING CHAT REQUEST RECEIVED")
+    print("=" * 60)
+    print(f" User ID: {user_id}")
+    print(f" Message: {request.message}")
+
+    async def events():
+        first_token_at = None
+        try:
+            consent_response = await run_in_threadpool(consent_gate, db, user_id, request, t)
+            if consent_response is not None:
+                yield sse_event("token", {"text": consent_response})
+                elapsed_ms = round((time.perf_counter() - started) * 1000)
+                yield sse_event("done", {"session_id": request.session_id, "ttft_ms": elapsed_ms, "total_ms": elapsed_ms})
+                return
+
+            intent, speculation = await speculate_turn(db, user_id, request.message, language)
+            turn = await run_in_threadpool(
+                prepare_turn, db, user_id, request.message, language, t, intent, speculation
+            )
+
+            if turn.prompt is None:
+                bot_response = await generate_turn_response(turn, request.message, t)
+                first_token_at = time.perf_counter()
+                yield sse_event("token", {"text": bot_response})
+            else:
+                parts = []
+                async for token in astream_chat(turn.prompt):
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        print(f" Time to first token: {(first_token_at - started) * 1000:.0f} ms")
+                    parts.append(token)
+                    yield sse_event("token", {"text": token})
+                bot_response = "".join(parts)
+
+            # The reply is only stored once it is complete, so an aborted stream leaves no partial message
+            await run_in_threadpool(finish_turn, db, user_id, request, language, turn, bot_response)
+
+            finished = time.perf_counter()
+            ttft = (first_token_at or finished) - started
+            print(f" Stream complete: TTFT {ttft * 1000:.0f} ms, total {(finished - started) * 1000:.0f} ms")
+            yield sse_event("done", {
+                "session_id": request.session_id,
+                "intent": intent,
+                "ttft_ms": round(ttft * 1000),
+                "total_ms": round((finished - started) * 1000),
+            })
+
+        except Exception as e:
+            print(f" Error in chat stream: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/chat/history/user/{user_id}")
 async def get_user_chat_history(
         user_id: str,
@@ -18,12 +18,66 @@ class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL")
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY")
     LLM_MODEL: str = os.getenv("LLM_MODEL", "llama-3.1-8b-instant")
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", 32))
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", 64))
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", 20))
+    LLM_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", 60))
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))
+    LLM_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", 5))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", 2))
+    LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "True").lower() == "true"
+
+    INTENT_CLASSIFIER: str = os.getenv("INTENT_CLASSIFIER", "local")
+    INTENT_MODEL_PATH: str = os.getenv("INTENT_MODEL_PATH", ".intent_model/centroids.npz")
+    INTENT_CONFIDENCE_THRESHOLD: float = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", 0.7))
 
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL")
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "huggingface")
+    EMBEDDING_ONNX_FILE: str = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model.onnx")
+    EMBEDDING_ONNX_PATH: str = os.getenv("EMBEDDING_ONNX_PATH")
+    EMBEDDING_THREADS: int = int(os.getenv("EMBEDDING_THREADS", 0))
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "True").lower() == "true"
+    DEDUP_MAX_DISTANCE: int = int(os.getenv("DEDUP_MAX_DISTANCE", 3))
+    EMBEDDING_STORE_DIR: str = os.getenv("EMBEDDING_STORE_DIR", ".embedding_store")
     EMBEDDING_DIMENSION: int = int(os.getenv("EMBEDDING_DIMENSION", 384))
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", 1024))
+    EMBEDDING_CACHE_TTL_SECONDS: float = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", 3600))
+    EMBEDDING_BATCH_MAX_SIZE: int = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", 32))
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", 5))
+
+    RETRIEVER_BACKEND: str = os.getenv("RETRIEVER_BACKEND", "memory")
+    MEMORY_INDEX_MODE: str = os.getenv("MEMORY_INDEX_MODE", "exact")
+    MEMORY_INDEX_REFRESH_SECONDS: float = float(os.getenv("MEMORY_INDEX_REFRESH_SECONDS", 30))
+    VECTOR_QUANTIZATION: str = os.getenv("VECTOR_QUANTIZATION", "none")
+    QUANTIZATION_RERANK_FACTOR: int = int(os.getenv("QUANTIZATION_RERANK_FACTOR", 10))
+
+    VECTOR_INDEX_TYPE: str = os.getenv("VECTOR_INDEX_TYPE", "hnsw")
+    VECTOR_INDEX_HNSW_M: int = int(os.getenv("VECTOR_INDEX_HNSW_M", 16))
+    VECTOR_INDEX_HNSW_EF_CONSTRUCTION: int = int(os.getenv("VECTOR_INDEX_HNSW_EF_CONSTRUCTION", 64))
+    VECTOR_INDEX_IVFFLAT_LISTS: int = int(os.getenv("VECTOR_INDEX_IVFFLAT_LISTS", 100))
+    VECTOR_SEARCH_HNSW_EF_SEARCH: int = int(os.getenv("VECTOR_SEARCH_HNSW_EF_SEARCH", 40))
+    VECTOR_SEARCH_IVFFLAT_PROBES: int = int(os.getenv("VECTOR_SEARCH_IVFFLAT_PROBES", 10))
+
+    CORPUS_COLLECTION_PREFIX: str = os.getenv("CORPUS_COLLECTION_PREFIX", "langchain")
+    CORPUS_COLLECTIONS_KEEP: int = int(os.getenv("CORPUS_COLLECTIONS_KEEP", 1))
+    CORPUS_VALIDATION_PROBES: int = int(os.getenv("CORPUS_VALIDATION_PROBES", 5))
+
+    HYBRID_SEARCH: bool = os.getenv("HYBRID_SEARCH", "True").lower() == "true"
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", 10))
+    RRF_K: int = int(os.getenv("RRF_K", 60))
+
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "True").lower() == "true"
+    ANSWER_CACHE_SIZE: int = int(os.getenv("ANSWER_CACHE_SIZE", 512))
+    ANSWER_CACHE_TTL_SECONDS: float = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", 3600))
+    ANSWER_CACHE_SIMILARITY: float = float(os.getenv("ANSWER_CACHE_SIMILARITY", 0.95))
 
     TOP_K: int = int(os.getenv("TOP_K", 5))
-    SIMILARITY_THRESHOLD: float = float(os.getenv("SIMILARITY_THRESHOLD", 0.7))
+    # MiniLM cosine scores for a question against a relevant passage mostly sit around 0.4-0.6, so 0.7
+    # rejected in-domain answers; recalibrate with python -m app.rag.langchain_rag_FINAL questions.txt
+    SIMILARITY_THRESHOLD: float = float(os.getenv("SIMILARITY_THRESHOLD", 0.35))
+    RETRIEVAL_SCORE_MARGIN: float = float(os.getenv("RETRIEVAL_SCORE_MARGIN", 0.15))
+    METADATA_ROUTING: bool = os.getenv("METADATA_ROUTING", "True").lower() == "true"
+    SPECULATIVE_RETRIEVAL: bool = os.getenv("SPECULATIVE_RETRIEVAL", "True").lower() == "true"
 
     ALLOW_GENERAL_MEDICAL_INFO: bool = os.getenv("ALLOW_GENERAL_MEDICAL_INFO", "True").lower() == "true"
     ALLOW_DIAGNOSIS: bool = os.getenv("ALLOW_DIAGNOSIS", "False").lower() == "true"
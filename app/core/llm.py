@@ -1,7 +1,12 @@
-from groq import Groq
+from groq import Groq, AsyncGroq
 import os
+import threading
+from contextlib import asynccontextmanager
 from pathlib import Path
+import anyio
+import httpx
 from dotenv import load_dotenv
+from app.core.config import settings
 
 env_path = Path(__file__).parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path, override=True)
@@ -15,19 +20,124 @@ if not GROQ_API_KEY:
 else:
     print(f"GROQ_API_KEY loaded successfully")
 
-client = Groq(api_key=GROQ_API_KEY)
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# One keep-alive connection pool per process, shared by every Groq caller:
+# chat answers, intent classification, clarification and memory summarization
+_limits = httpx.Limits(
+    max_connections=settings.LLM_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY_SECONDS,
+)
+_timeout = httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=settings.LLM_CONNECT_TIMEOUT_SECONDS)
+_http2 = settings.LLM_HTTP2 and HTTP2_AVAILABLE
+
+http_client = httpx.Client(limits=_limits, timeout=_timeout, http2=_http2)
+async_http_client = httpx.AsyncClient(limits=_limits, timeout=_timeout, http2=_http2)
+
+client = Groq(api_key=GROQ_API_KEY, http_client=http_client, max_retries=settings.LLM_MAX_RETRIES)
+async_client = AsyncGroq(api_key=GROQ_API_KEY, http_client=async_http_client, max_retries=settings.LLM_MAX_RETRIES)
+
+# Caps in-flight requests so a burst queues here instead of tripping Groq rate limits. Sync and
+# async calls draw from this one budget: threads block on it directly, coroutines block on it from
+# a worker thread, so every caller waits in the same queue and wakes as soon as a slot frees
+_slots = threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY)
+
+# Coroutines beyond this many queue on the limiter (FIFO) rather than each holding a blocked thread,
+# and these threads never count against the threadpool that serves sync endpoints. Created on first
+# use, since an anyio limiter needs the running event loop
+_slot_waiters = None
+
+_chat_model = None
+_chat_model_lock = threading.Lock()
+
+
+@asynccontextmanager
+async def llm_slot():
+    global _slot_waiters
+
+    if _slot_waiters is None:
+        _slot_waiters = anyio.CapacityLimiter(settings.LLM_MAX_CONCURRENCY)
+
+    # Not cancellable while waiting, so a cancelled request cannot leave an acquired slot behind
+    await anyio.to_thread.run_sync(_slots.acquire, limiter=_slot_waiters)
+    try:
+        yield
+    finally:
+        _slots.release()
+
+
+def get_chat_model():
+    global _chat_model
+
+    with _chat_model_lock:
+        if _chat_model is None:
+            from langchain_groq import ChatGroq
+
+            model = ChatGroq(
+                model=settings.LLM_MODEL,
+                temperature=0.2,
+                groq_api_key=GROQ_API_KEY
+            )
+            # ChatGroq creates its own Groq clients; route it through the shared pool instead
+            model.client = client.chat.completions
+            model.async_client = async_client.chat.completions
+            _chat_model = model
+        return _chat_model
+
+
+async def ainvoke_chat(prompt: str) -> str:
+    async with llm_slot():
+        response = await get_chat_model().ainvoke(prompt)
+    return response.content
+
+
+async def astream_chat(prompt: str):
+    # The slot is held for the whole stream, since the connection stays busy until the last token
+    async with llm_slot():
+        async for chunk in get_chat_model().astream(prompt):
+            if chunk.content:
+                yield chunk.content
+
 
 def get_llm_response(prompt: str) -> str:
     try:
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": "You are a helpful medical assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2
-        )
+        with _slots:
+            response = client.chat.completions.create(
+                model=settings.LLM_MODEL,
+                messages=[
+                    {"role": "system", "content": "You are a helpful medical assistant."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.2
+            )
+        return response.choices[0].message.content
+    except Exception as e:
+        print(f"Error calling Groq API: {e}")
+        raise
+
+
+async def get_llm_response_async(prompt: str) -> str:
+    try:
+        async with llm_slot():
+            response = await async_client.chat.completions.create(
+                model=settings.LLM_MODEL,
+                messages=[
+                    {"role": "system", "content": "You are a helpful medical assistant."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.2
+            )
         return response.choices[0].message.content
     except Exception as e:
         print(f"Error calling Groq API: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+async def close_llm_clients():
+    http_client.close()
+    await async_http_client.aclose()
@@ -1,10 +1,11 @@
-from app.core.llm import get_llm_response
+import asyncio
+from app.core.config import settings
+from app.core.llm import get_llm_response, get_llm_response_async
+from app.logic.intent_model import predict_intent
 
-def classify_intent(query: str) -> str:
-    if not query or len(query.strip()) < 2:
-        return "GREETING"
 
-    prompt = f"""You are an intent classifier for a medical chatbot.
+def _intent_prompt(query: str) -> str:
+    return f"""You are an intent classifier for a medical chatbot.
 
 Classify the following user message into ONE category:
 
@@ -25,26 +26,67 @@ Respond with ONLY the category name. Examples:
 
 Category:"""
 
+
+def _parse_intent(response: str) -> str:
+    response = response.strip().upper()
+    if "MEDICAL" in response:
+        return "MEDICAL"
+    elif "GENERAL_CHAT" in response:
+        return "GENERAL_CHAT"
+    elif "AMBIGUOUS" in response:
+        return "AMBIGUOUS"
+    elif "OTHER" in response:
+        return "OTHER"
+    else:
+        return "GENERAL_CHAT"
+
+
+def _local_intent(query: str):
+    prediction = predict_intent(query)
+    if prediction is None:
+        return None
+
+    intent, confidence = prediction
+    if confidence < settings.INTENT_CONFIDENCE_THRESHOLD:
+        print(f" Local intent {intent} below threshold ({confidence:.2f}), asking the LLM")
+        return None
+    print(f" Local intent {intent} ({confidence:.2f})")
+    return intent
+
+
+def classify_intent_llm(query: str) -> str:
     try:
-        response = get_llm_response(prompt).strip().upper()
-        if "MEDICAL" in response:
-            return "MEDICAL"
-        elif "GENERAL_CHAT" in response:
-            return "GENERAL_CHAT"
-        elif "AMBIGUOUS" in response:
-            return "AMBIGUOUS"
-        elif "OTHER" in response:
-            return "OTHER"
-        else:
-            return "GENERAL_CHAT"
+        return _parse_intent(get_llm_response(_intent_prompt(query)))
+    except Exception as e:
+        print(f"Error classifying intent: {e}")
+        return "GENERAL_CHAT"
+
+
+def classify_intent(query: str) -> str:
+    if not query or len(query.strip()) < 2:
+        return "GREETING"
+
+    return _local_intent(query) or classify_intent_llm(query)
 
+
+async def classify_intent_async(query: str) -> str:
+    if not query or len(query.strip()) < 2:
+        return "GREETING"
+
+    # Embedding the query is CPU work, so it stays off the event loop
+    intent = await asyncio.to_thread(_local_intent, query)
+    if intent is not None:
+        return intent
+
+    try:
+        return _parse_intent(await get_llm_response_async(_intent_prompt(query)))
     except Exception as e:
         print(f"Error classifying intent: {e}")
         return "GENERAL_CHAT"
 
 
-def get_clarification_question(query: str) -> str:
-    prompt = f"""User said: "{query}"
+def _clarification_prompt(query: str) -> str:
+    return f"""User said: "{query}"
 
 Generate ONE short clarification question to understand if they're asking about:
 1. Medical/health topic
@@ -53,8 +95,17 @@ Generate ONE short clarification question to understand if they're asking about:
 
 Question should be natural and helpful. Keep it under 15 words."""
 
+
+def get_clarification_question(query: str) -> str:
+    try:
+        return get_llm_response(_clarification_prompt(query)).strip()
+    except:
+        return "Could you clarify what you're asking about?"
+
+
+async def get_clarification_question_async(query: str) -> str:
     try:
-        return get_llm_response(prompt).strip()
+        return (await get_llm_response_async(_clarification_prompt(query))).strip()
     except:
         return "Could you clarify what you're asking about?"
 
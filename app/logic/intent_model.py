@@ -0,0 +1,266 @@
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+import numpy as np
+from app.core.config import settings
+
+INTENT_LABELS = ("MEDICAL", "GENERAL_CHAT", "AMBIGUOUS", "OTHER")
+
+# Sharpens cosine similarities into a distribution; MiniLM similarities between
+# short messages are bunched together, so the raw scores make a poor confidence
+SOFTMAX_TEMPERATURE = 0.05
+
+# A model file that fails to load (half-copied, corrupt) is retried this often instead of on every query
+LOAD_RETRY_SECONDS = 60
+
+SEED_EXAMPLES = {
+    "MEDICAL": [
+        "What is diabetes?", "I have a headache", "What are the symptoms of a heart attack?",
+        "How is high blood pressure treated?", "Is chest pain after exercise dangerous?",
+        "What does a cardiologist do?", "How much does an MRI cost?", "What are the OPD timings?",
+        "Which doctor should I see for knee pain?", "Can I take paracetamol for fever?",
+        "My child has a rash and fever", "How do I prepare for a colonoscopy?",
+        "What vaccines does a newborn need?", "Does the hospital have an ICU?",
+        "I feel dizzy and nauseous", "What is the fee for a dental checkup?",
+        "How long does recovery from knee replacement take?", "What causes asthma attacks?",
+        "मुझे बुखार और खांसी है", "डायबिटीज के लक्षण क्या हैं?",
+    ],
+    "GENERAL_CHAT": [
+        "Hi, how are you?", "What can you do?", "Tell me about yourself", "Who built you?",
+        "Good morning", "Thanks for your help", "Are you a real doctor?", "Nice talking to you",
+        "What is your name?", "How does this chatbot work?", "Can you speak Hindi?",
+        "You are very helpful", "नमस्ते, आप कैसे हैं?",
+    ],
+    "AMBIGUOUS": [
+        "Tell me something", "I need help", "What about it?", "Is it bad?", "Can you check this",
+        "What should I do?", "It hurts sometimes", "Explain more", "I am not sure",
+        "Is that normal?", "What do you think?",
+    ],
+    "OTHER": [
+        "Book me a taxi", "What's the weather today?", "Recommend a good movie",
+        "Who won the cricket match?", "Write me a poem", "Help me with my homework",
+        "Are there any job openings?", "Order a pizza", "What is the capital of France?",
+        "Tell me a joke", "How do I invest in stocks?", "Translate this sentence to French",
+    ],
+}
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class NearestCentroidIntentClassifier:
+    def __init__(self, labels: List[str], centroids: np.ndarray, model_id: str):
+        self.labels = list(labels)
+        self.centroids = _normalize(np.asarray(centroids, dtype=np.float32))
+        self.model_id = model_id
+
+    @classmethod
+    def fit(cls, texts: List[str], labels: List[str], embeddings, model_id: str):
+        vectors = _normalize(np.asarray(embeddings.embed_documents(texts), dtype=np.float32))
+        labels = np.asarray(labels)
+        present = [label for label in INTENT_LABELS if (labels == label).any()]
+        centroids = np.stack([vectors[labels == label].mean(axis=0) for label in present])
+        return cls(present, centroids, model_id)
+
+    def predict_vector(self, vector) -> tuple:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        similarities = self.centroids @ (vector / norm if norm else vector)
+        logits = (similarities - similarities.max()) / SOFTMAX_TEMPERATURE
+        probabilities = np.exp(logits) / np.exp(logits).sum()
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as handle:
+            np.savez(handle, labels=np.asarray(self.labels), centroids=self.centroids,
+                     model_id=np.asarray(self.model_id))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            return cls([str(label) for label in data["labels"]], data["centroids"], str(data["model_id"]))
+
+
+_classifier = None
+_classifier_loaded = False
+_classifier_failed_at = None
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier() -> Optional[NearestCentroidIntentClassifier]:
+    global _classifier, _classifier_loaded, _classifier_failed_at
+
+    with _classifier_lock:
+        if _classifier_loaded:
+            return _classifier
+        if _classifier_failed_at is not None and time.monotonic() - _classifier_failed_at < LOAD_RETRY_SECONDS:
+            return None
+
+        if settings.INTENT_CLASSIFIER != "local":
+            _classifier_loaded = True
+            return None
+        if not os.path.exists(settings.INTENT_MODEL_PATH):
+            print(f" No intent model at {settings.INTENT_MODEL_PATH}; classifying intents with the LLM")
+            _classifier_loaded = True
+            return None
+
+        from app.rag.embedding_store import get_embedding_model_id
+
+        try:
+            classifier = NearestCentroidIntentClassifier.load(settings.INTENT_MODEL_PATH)
+        except Exception as e:
+            # Callers fall back to the LLM classifier until a later attempt loads the model
+            print(f" Could not load intent model {settings.INTENT_MODEL_PATH}: {e}; classifying intents with the LLM")
+            _classifier_failed_at = time.monotonic()
+            return None
+
+        _classifier_loaded = True
+        # Centroids are only meaningful in the vector space they were trained in
+        if classifier.model_id != get_embedding_model_id():
+            print(f" Intent model was trained with {classifier.model_id}; retrain it for {get_embedding_model_id()}")
+            return None
+
+        print(f" Local intent classifier loaded ({', '.join(classifier.labels)})")
+        _classifier = classifier
+        return _classifier
+
+
+def predict_intent(query: str) -> Optional[tuple]:
+    # Returns (label, confidence), or None when no local model can answer
+    from app.rag.langchain_rag_FINAL import get_rag_pipeline, is_rag_ready
+
+    classifier = get_intent_classifier()
+    if classifier is None or not is_rag_ready():
+        return None
+
+    try:
+        return classifier.predict_vector(get_rag_pipeline().embeddings.embed_query(query))
+    except Exception as e:
+        print(f" Local intent classification failed: {e}")
+        return None
+
+
+def load_examples(path: str) -> List[tuple]:
+    examples = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                record = json.loads(line)
+                if record["intent"] in INTENT_LABELS:
+                    examples.append((record["text"], record["intent"]))
+    return examples
+
+
+def label_chat_logs(limit: int) -> List[tuple]:
+    # Past user messages, labelled by the LLM classifier the local model replaces
+    from app.core.database import SessionLocal
+    from app.models.chat import Chat
+    from app.logic.intent_classifier_advanced import classify_intent_llm
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Chat.message).order_by(Chat.timestamp.desc()).limit(limit).all()
+    finally:
+        db.close()
+
+    messages = list(dict.fromkeys(row[0].strip() for row in rows if row[0] and len(row[0].strip()) >= 2))
+    examples = []
+    for i, message in enumerate(messages, start=1):
+        examples.append((message, classify_intent_llm(message)))
+        if i % 50 == 0:
+            print(f"  Labelled {i}/{len(messages)} chat messages")
+    return examples
+
+
+def split_examples(examples: List[tuple], holdout: float) -> tuple:
+    # Deterministic per-label split, so every label is represented on both sides
+    train, test = [], []
+    for label in INTENT_LABELS:
+        items = [example for example in examples if example[1] == label]
+        every = max(2, round(1 / holdout)) if holdout > 0 else 0
+        for i, example in enumerate(items):
+            (test if every and i % every == every - 1 else train).append(example)
+    return train, test
+
+
+def evaluate(classifier: NearestCentroidIntentClassifier, examples: List[tuple], embeddings,
+             threshold: float) -> dict:
+    vectors = embeddings.embed_documents([text for text, _ in examples])
+    predictions = [classifier.predict_vector(vector) for vector in vectors]
+
+    correct = sum(predicted == label for (predicted, _), (_, label) in zip(predictions, examples))
+    local = [(predicted, label) for (predicted, confidence), (_, label) in zip(predictions, examples)
+             if confidence >= threshold]
+    per_label = {}
+    for label in INTENT_LABELS:
+        hits = [predicted == expected for (predicted, _), (_, expected) in zip(predictions, examples)
+                if expected == label]
+        if hits:
+            per_label[label] = sum(hits) / len(hits)
+
+    return {
+        "examples": len(examples),
+        "accuracy": correct / len(examples) if examples else 0.0,
+        "local_coverage": len(local) / len(examples) if examples else 0.0,
+        "local_accuracy": sum(p == l for p, l in local) / len(local) if local else 0.0,
+        "per_label_recall": per_label,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from app.rag.embedding_backends import get_embedding_backend
+    from app.rag.embedding_store import get_embedding_model_id
+
+    parser = argparse.ArgumentParser(description="Train and evaluate the local intent classifier")
+    parser.add_argument("--examples", help="JSONL file of {\"text\": ..., \"intent\": ...} records")
+    parser.add_argument("--chat-logs", type=int, default=0, help="Label this many recent chat messages with the LLM")
+    parser.add_argument("--export", help="Write the combined training set to this JSONL file for review")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of examples held out for evaluation")
+    parser.add_argument("--threshold", type=float, default=settings.INTENT_CONFIDENCE_THRESHOLD)
+    parser.add_argument("--eval-only", action="store_true", help="Report metrics without saving a model")
+    args = parser.parse_args()
+
+    examples = [(text, label) for label, texts in SEED_EXAMPLES.items() for text in texts]
+    if args.examples:
+        examples += load_examples(args.examples)
+    if args.chat_logs:
+        examples += label_chat_logs(args.chat_logs)
+    examples = list(dict.fromkeys(examples))
+
+    if args.export:
+        with open(args.export, "w", encoding="utf-8") as handle:
+            for text, label in examples:
+                handle.write(json.dumps({"text": text, "intent": label}, ensure_ascii=False) + "\n")
+        print(f"Wrote {len(examples)} examples to {args.export}")
+
+    embeddings = get_embedding_backend()
+    model_id = get_embedding_model_id()
+
+    train, test = split_examples(examples, args.holdout)
+    if test:
+        metrics = evaluate(NearestCentroidIntentClassifier.fit(
+            [text for text, _ in train], [label for _, label in train], embeddings, model_id
+        ), test, embeddings, args.threshold)
+        print(f"Held-out examples:  {metrics['examples']}")
+        print(f"Accuracy:           {metrics['accuracy']:.3f}")
+        print(f"Answered locally:   {metrics['local_coverage']:.3f} (confidence >= {args.threshold})")
+        print(f"Local accuracy:     {metrics['local_accuracy']:.3f}")
+        for label, recall in metrics["per_label_recall"].items():
+            print(f"  {label:<13} recall {recall:.3f}")
+
+    if not args.eval_only:
+        classifier = NearestCentroidIntentClassifier.fit(
+            [text for text, _ in examples], [label for _, label in examples], embeddings, model_id
+        )
+        classifier.save(settings.INTENT_MODEL_PATH)
+        print(f"Saved intent model ({len(examples)} examples, {model_id}) to {settings.INTENT_MODEL_PATH}")
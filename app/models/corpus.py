@@ -0,0 +1,32 @@
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class CorpusVersion(Base):
+    __tablename__ = "corpus_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+    def __repr__(self):
+        return f"<CorpusVersion(name='{self.name}', version={self.version})>"
+
+
+class CorpusCollection(Base):
+    __tablename__ = "corpus_collections"
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    status = Column(String, default="building", nullable=False)
+    document_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    activated_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<CorpusCollection(name='{self.name}', version={self.version}, status='{self.status}')>"
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Text, Integer
+from sqlalchemy import Column, Text, Integer, String
+from app.core.config import settings
 from app.core.database import Base
 from pgvector.sqlalchemy import Vector
 
@@ -7,4 +8,14 @@ class Document(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     content = Column(Text, nullable=False)
-    embedding = Column(Vector(384), nullable=True)
\ No newline at end of file
+    embedding = Column(Vector(settings.EMBEDDING_DIMENSION), nullable=True)
+
+    # Partition labels, filled in at ingestion by app.rag.metadata.infer_metadata
+    department = Column(String, nullable=True)
+    doc_type = Column(String, nullable=True)
+    language = Column(String, nullable=True)
+    source = Column(String, nullable=True)
+
+    # Where the chunk sits in the text extracted from its source file, set by ingest_files.py
+    chunk_start = Column(Integer, nullable=True)
+    chunk_end = Column(Integer, nullable=True)
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+
+
+class SemanticAnswerCache:
+    def __init__(self, max_size: int = 512, ttl_seconds: float = 3600, similarity_threshold: float = 0.95):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        # (language, corpus_version) -> OrderedDict[entry_id, (vector, response, created_at)]
+        self._buckets = {}
+        self._size = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop_stale_versions(self, corpus_version):
+        for key in [key for key in self._buckets if key[1] != corpus_version]:
+            self._size -= len(self._buckets.pop(key))
+
+    def _expire(self, bucket: OrderedDict):
+        if not self.ttl_seconds:
+            return
+        now = time.monotonic()
+        for entry_id in [entry_id for entry_id, entry in bucket.items() if now - entry[2] > self.ttl_seconds]:
+            del bucket[entry_id]
+            self._size -= 1
+
+    def get(self, query_vector, language: str, corpus_version) -> Optional[str]:
+        query_vector = self._normalize(query_vector)
+
+        with self._lock:
+            self._drop_stale_versions(corpus_version)
+            bucket = self._buckets.get((language, corpus_version))
+            if bucket:
+                self._expire(bucket)
+
+            if not bucket:
+                self.misses += 1
+                return None
+
+            entry_ids = list(bucket.keys())
+            matrix = np.stack([bucket[entry_id][0] for entry_id in entry_ids])
+            scores = matrix @ query_vector
+            best = int(np.argmax(scores))
+
+            if scores[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            entry_id = entry_ids[best]
+            bucket.move_to_end(entry_id)
+            self.hits += 1
+            return bucket[entry_id][1]
+
+    def put(self, query_vector, language: str, corpus_version, response: str):
+        query_vector = self._normalize(query_vector)
+
+        with self._lock:
+            self._drop_stale_versions(corpus_version)
+            bucket = self._buckets.setdefault((language, corpus_version), OrderedDict())
+            bucket[self._next_id] = (query_vector, response, time.monotonic())
+            self._next_id += 1
+            self._size += 1
+
+            while self._size > self.max_size:
+                oldest_key = min(
+                    (key for key in self._buckets if self._buckets[key]),
+                    key=lambda key: next(iter(self._buckets[key].values()))[2]
+                )
+                self._buckets[oldest_key].popitem(last=False)
+                self._size -= 1
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": self._size,
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "similarity_threshold": self.similarity_threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
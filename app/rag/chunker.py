@@ -1,37 +1,195 @@
-def chunk_document(text: str, chunk_size: int = 300, overlap: int = 50) -> list:
-    chunks = []
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, NamedTuple, Union
+
+_CODE_BLOCK_RE = re.compile(r'```[\s\S]*?```')
+_CODE_TAG_RE = re.compile(r'<code>[\s\S]*?</code>')
+_METADATA_JSON_RE = re.compile(r'"metadata":\s*\{[^}]*\}')
+_SOURCE_BRACES_RE = re.compile(r'\{[^}]*source[^}]*\}')
+
+_SENTENCE_BOUNDARY_RE = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+_PARAGRAPH_BOUNDARY_RE = re.compile(r'\n\s*\n')
+_WORD_RE = re.compile(r'\S+\s*')
+_TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+
+BOUNDARY_SENTENCE = "sentence"
+BOUNDARY_PARAGRAPH = "paragraph"
+
+# Without a boundary for this long, pending text is cut at word boundaries to keep memory flat
+MAX_PENDING_CHARS = 64 * 1024
+BOUNDARY_LOOKBACK_CHARS = 64
+
+
+class ChunkSpan(NamedTuple):
+    start: int
+    end: int
+    text: str
+    tokens: int
+
+
+def count_tokens_regex(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
 
-    text = remove_code_blocks(text)
-    text = remove_metadata(text)
 
-    sentences = text.split(". ")
-    current_chunk = ""
+@lru_cache(maxsize=4)
+def get_token_counter(model_name: str = None) -> Callable[[str], int]:
+    try:
+        from tokenizers import Tokenizer
+        from app.rag.embedding_backends import get_embedding_model_name
 
-    for sentence in sentences:
-        sentence = sentence.strip()
-        if not sentence:  
+        tokenizer = Tokenizer.from_pretrained(model_name or get_embedding_model_name())
+    except Exception as e:
+        print(f" Tokenizer unavailable, counting tokens with a regex: {e}")
+        return count_tokens_regex
+
+    def count_tokens(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+    return count_tokens
+
+
+def _iter_units(source: Union[str, Iterable[str]], boundary_re) -> Iterator[tuple]:
+    # Yields (start, text) segments ending at a boundary; offsets are relative to the whole stream
+    pieces = [source] if isinstance(source, str) else source
+    pending = ""
+    pending_offset = 0
+    scan_from = 0
+
+    for piece in pieces:
+        if not piece:
             continue
+        pending += piece
+
+        cut = 0
+        held_start = None
+        for match in boundary_re.finditer(pending, scan_from):
+            # A boundary touching the end may still grow with the next piece
+            if match.end() >= len(pending):
+                held_start = match.start()
+                break
+            yield pending_offset + cut, pending[cut:match.end()]
+            cut = match.end()
+
+        if cut == 0 and len(pending) > MAX_PENDING_CHARS:
+            last_space = pending.rfind(" ", 0, MAX_PENDING_CHARS)
+            cut = last_space + 1 if last_space > 0 else MAX_PENDING_CHARS
+            yield pending_offset, pending[:cut]
+
+        if cut:
+            pending = pending[cut:]
+            pending_offset += cut
+
+        # Rescan only the tail, so each character is examined a bounded number of times
+        if held_start is not None and held_start >= cut:
+            scan_from = held_start - cut
+        else:
+            scan_from = max(len(pending) - BOUNDARY_LOOKBACK_CHARS, 0)
+
+    if pending:
+        yield pending_offset, pending
 
-        current_chunk += sentence + ". "
 
-        if len(current_chunk) >= chunk_size:
-            if len(current_chunk.strip()) > 50:
-                chunks.append(current_chunk.strip())
-            current_chunk = sentence[-overlap:] if len(sentence) > overlap else sentence
+def _split_long_unit(start: int, text: str, max_tokens: int, count_tokens) -> Iterator[tuple]:
+    piece_start = start
+    piece = ""
+    piece_tokens = 0
+    offset = start
 
-    if len(current_chunk.strip()) > 50:
-        chunks.append(current_chunk.strip())
+    for match in _WORD_RE.finditer(text):
+        word = match.group()
+        word_tokens = count_tokens(word)
+        if piece and piece_tokens + word_tokens > max_tokens:
+            yield piece_start, piece, piece_tokens
+            piece_start = offset
+            piece = ""
+            piece_tokens = 0
+        piece += word
+        piece_tokens += word_tokens
+        offset = start + match.end()
+
+    if piece:
+        yield piece_start, piece, piece_tokens
+
+
+def _make_span(units: list, min_chars: int):
+    start = units[0][0]
+    raw = "".join(text for _, text, _ in units)
+    stripped = raw.strip()
+    if len(stripped) <= min_chars:
+        return None
+
+    leading = len(raw) - len(raw.lstrip())
+    start += leading
+    return ChunkSpan(start, start + len(stripped), stripped, sum(tokens for _, _, tokens in units))
+
+
+def iter_chunk_spans(source: Union[str, Iterable[str]], max_tokens: int = 128, overlap_tokens: int = 24,
+                     boundary: str = BOUNDARY_SENTENCE, count_tokens: Callable[[str], int] = None,
+                     min_chars: int = 0) -> Iterator[ChunkSpan]:
+    if boundary not in (BOUNDARY_SENTENCE, BOUNDARY_PARAGRAPH):
+        raise ValueError(f"Unknown boundary: {boundary}")
+
+    count_tokens = count_tokens or get_token_counter()
+    boundary_re = _SENTENCE_BOUNDARY_RE if boundary == BOUNDARY_SENTENCE else _PARAGRAPH_BOUNDARY_RE
+
+    units = []
+    unit_tokens = 0
+
+    for unit_start, unit_text in _iter_units(source, boundary_re):
+        tokens = count_tokens(unit_text)
+        if tokens > max_tokens:
+            parts = list(_split_long_unit(unit_start, unit_text, max_tokens, count_tokens))
+        else:
+            parts = [(unit_start, unit_text, tokens)]
+
+        for part in parts:
+            if units and unit_tokens + part[2] > max_tokens:
+                span = _make_span(units, min_chars)
+                if span:
+                    yield span
+
+                # Overlap carries whole trailing units rather than a slice of the last one
+                carried = []
+                carried_tokens = 0
+                for unit in reversed(units):
+                    if carried_tokens + unit[2] > overlap_tokens:
+                        break
+                    carried.insert(0, unit)
+                    carried_tokens += unit[2]
+                if carried_tokens + part[2] > max_tokens:
+                    carried = []
+                    carried_tokens = 0
+                units = carried
+                unit_tokens = carried_tokens
+
+            units.append(part)
+            unit_tokens += part[2]
+
+    if units:
+        span = _make_span(units, min_chars)
+        if span:
+            yield span
+
+
+def chunk_document(text: str, chunk_size: int = 128, overlap: int = 24,
+                   boundary: str = BOUNDARY_SENTENCE) -> list:
+    text = remove_code_blocks(text)
+    text = remove_metadata(text)
+
+    return [
+        span.text
+        for span in iter_chunk_spans(text, max_tokens=chunk_size, overlap_tokens=overlap,
+                                     boundary=boundary, min_chars=50)
+    ]
 
-    return chunks
 
 def remove_code_blocks(text: str) -> str:
-    import re
-    text = re.sub(r'```[\s\S]*?```', '', text)
-    text = re.sub(r'<code>[\s\S]*?</code>', '', text)
+    text = _CODE_BLOCK_RE.sub('', text)
+    text = _CODE_TAG_RE.sub('', text)
     return text
 
+
 def remove_metadata(text: str) -> str:
-    import re
-    text = re.sub(r'"metadata":\s*\{[^}]*\}', '', text)
-    text = re.sub(r'\{[^}]*source[^}]*\}', '', text)
-    return text
\ No newline at end of file
+    text = _METADATA_JSON_RE.sub('', text)
+    text = _SOURCE_BRACES_RE.sub('', text)
+    return text
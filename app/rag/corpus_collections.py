@@ -0,0 +1,195 @@
+from typing import Optional
+from sqlalchemy import func, text
+from app.core.config import settings
+from app.core.database import engine
+from app.models.corpus import CorpusCollection
+from app.rag.corpus_version import bump_corpus_version
+from app.rag.pgvector_index import drop_collection_index
+
+STATUS_BUILDING = "building"
+STATUS_READY = "ready"
+STATUS_ACTIVE = "active"
+STATUS_RETIRED = "retired"
+STATUS_FAILED = "failed"
+
+
+def ensure_collection_table(bind=engine):
+    CorpusCollection.__table__.create(bind=bind, checkfirst=True)
+
+
+def collection_uuid(db, name: str) -> Optional[str]:
+    value = db.execute(
+        text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"),
+        {"name": name}
+    ).scalar()
+    return str(value) if value is not None else None
+
+
+def collection_embedding_model(db, name: str) -> Optional[str]:
+    # ingest_langchain.py stamps every entry of a build with the model that encoded it
+    return db.execute(text("""
+        SELECT e.cmetadata->>'embedding_model'
+        FROM langchain_pg_embedding e
+        JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+        WHERE c.name = :name
+        LIMIT 1
+    """), {"name": name}).scalar()
+
+
+def get_active_collection(db) -> Optional[CorpusCollection]:
+    return db.query(CorpusCollection).filter(CorpusCollection.status == STATUS_ACTIVE).first()
+
+
+def get_active_collection_name(db) -> str:
+    # Before the first versioned build, readers keep using the original unversioned collection
+    active = get_active_collection(db)
+    return active.name if active else settings.CORPUS_COLLECTION_PREFIX
+
+
+def register_legacy_collection(db) -> Optional[CorpusCollection]:
+    # The unversioned collection becomes version 0, so it is retired and collected like any other
+    if get_active_collection(db) is not None:
+        return None
+    name = settings.CORPUS_COLLECTION_PREFIX
+    if collection_uuid(db, name) is None or db.get(CorpusCollection, 0) is not None:
+        return None
+
+    row = CorpusCollection(version=0, name=name, status=STATUS_ACTIVE)
+    db.add(row)
+    db.flush()
+    return row
+
+
+def start_collection_build(db) -> CorpusCollection:
+    # An interrupted build is resumed rather than started over
+    building = (
+        db.query(CorpusCollection)
+        .filter(CorpusCollection.status == STATUS_BUILDING)
+        .order_by(CorpusCollection.version.desc())
+        .first()
+    )
+    if building:
+        return building
+
+    version = (db.query(func.max(CorpusCollection.version)).scalar() or 0) + 1
+    row = CorpusCollection(
+        version=version,
+        name=f"{settings.CORPUS_COLLECTION_PREFIX}_v{version}",
+        status=STATUS_BUILDING
+    )
+    db.add(row)
+    db.flush()
+    return row
+
+
+def validate_collection(db, row: CorpusCollection, expected_count: int) -> list:
+    uuid = collection_uuid(db, row.name)
+    if uuid is None:
+        return [f"collection {row.name} does not exist"]
+
+    problems = []
+    count, missing_vectors = db.execute(text("""
+        SELECT count(*), count(*) FILTER (WHERE embedding IS NULL)
+        FROM langchain_pg_embedding WHERE collection_id = :uuid
+    """), {"uuid": uuid}).one()
+
+    if count != expected_count:
+        problems.append(f"expected {expected_count} entries, found {count}")
+    if missing_vectors:
+        problems.append(f"{missing_vectors} entries have no embedding")
+
+    # Each probe must find its own vector (or an identical one) first through the new index
+    probes = db.execute(text("""
+        SELECT custom_id, embedding::text FROM langchain_pg_embedding
+        WHERE collection_id = :uuid AND embedding IS NOT NULL
+        ORDER BY random() LIMIT :limit
+    """), {"uuid": uuid, "limit": settings.CORPUS_VALIDATION_PROBES}).all()
+
+    for custom_id, embedding in probes:
+        distance = db.execute(text("""
+            SELECT embedding <=> CAST(:embedding AS vector) AS distance
+            FROM langchain_pg_embedding
+            WHERE collection_id = :uuid
+            ORDER BY distance LIMIT 1
+        """), {"uuid": uuid, "embedding": embedding}).scalar()
+        if distance is None or distance > 1e-4:
+            problems.append(f"probe {custom_id} did not find itself (nearest distance {distance})")
+
+    return problems
+
+
+def activate_collection(db, version: int) -> CorpusCollection:
+    # Locking every row serializes concurrent switches; flushed but not committed, like the version bump
+    rows = db.query(CorpusCollection).with_for_update().all()
+    target = next((row for row in rows if row.version == version), None)
+
+    if target is None:
+        raise ValueError(f"Unknown corpus collection version: {version}")
+    if target.status not in (STATUS_READY, STATUS_RETIRED, STATUS_ACTIVE):
+        raise ValueError(f"Collection {target.name} is {target.status} and cannot be activated")
+
+    for row in rows:
+        if row.status == STATUS_ACTIVE and row is not target:
+            row.status = STATUS_RETIRED
+
+    target.status = STATUS_ACTIVE
+    target.activated_at = func.now()
+    db.flush()
+
+    # Readers notice the switch through the corpus version, which also invalidates cached answers
+    bump_corpus_version(db)
+    print(f" Active corpus collection is now {target.name}")
+    return target
+
+
+def drop_collection(db, row: CorpusCollection):
+    uuid = collection_uuid(db, row.name)
+    drop_collection_index(db, row.version)
+    if uuid is not None:
+        db.execute(text("DELETE FROM langchain_pg_embedding WHERE collection_id = :uuid"), {"uuid": uuid})
+        db.execute(text("DELETE FROM langchain_pg_collection WHERE uuid = :uuid"), {"uuid": uuid})
+    db.delete(row)
+
+
+def garbage_collect_collections(db, keep: int = None) -> list:
+    # Recently retired versions are kept for rollback and for readers that have not switched yet
+    keep = settings.CORPUS_COLLECTIONS_KEEP if keep is None else keep
+    retired = (
+        db.query(CorpusCollection)
+        .filter(CorpusCollection.status == STATUS_RETIRED)
+        .order_by(CorpusCollection.version.desc())
+        .all()
+    )
+    failed = db.query(CorpusCollection).filter(CorpusCollection.status == STATUS_FAILED).all()
+
+    dropped = []
+    for row in retired[keep:] + failed:
+        print(f" Dropping corpus collection {row.name} ({row.status})")
+        drop_collection(db, row)
+        dropped.append(row.name)
+    return dropped
+
+
+if __name__ == "__main__":
+    import argparse
+    from app.core.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Inspect and switch versioned corpus collections")
+    parser.add_argument("--activate", type=int, help="Switch readers to this version (e.g. to roll back)")
+    parser.add_argument("--gc", action="store_true", help="Drop retired versions beyond CORPUS_COLLECTIONS_KEEP")
+    args = parser.parse_args()
+
+    ensure_collection_table()
+    db = SessionLocal()
+    try:
+        if args.activate is not None:
+            activate_collection(db, args.activate)
+            db.commit()
+        if args.gc:
+            garbage_collect_collections(db)
+            db.commit()
+
+        for row in db.query(CorpusCollection).order_by(CorpusCollection.version):
+            print(f"  v{row.version:<4} {row.status:<9} {row.document_count:>8} docs  {row.name}")
+    finally:
+        db.close()
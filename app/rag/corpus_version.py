@@ -0,0 +1,23 @@
+from app.models.corpus import CorpusVersion
+
+DEFAULT_CORPUS = "default"
+
+
+def get_corpus_version(db, name: str = DEFAULT_CORPUS) -> int:
+    row = db.query(CorpusVersion).filter(CorpusVersion.name == name).first()
+    return row.version if row else 0
+
+
+def bump_corpus_version(db, name: str = DEFAULT_CORPUS) -> int:
+    # Flushed but not committed: the bump lands in the same transaction as the corpus change
+    row = db.query(CorpusVersion).filter(CorpusVersion.name == name).with_for_update().first()
+
+    if row:
+        row.version += 1
+    else:
+        row = CorpusVersion(name=name, version=1)
+        db.add(row)
+
+    db.flush()
+    print(f" Corpus '{name}' is now at version {row.version}")
+    return row.version
@@ -0,0 +1,103 @@
+import hashlib
+import re
+from collections import defaultdict
+from typing import List, Optional
+
+_WORD_RE = re.compile(r"\w+")
+_NUMBER_RE = re.compile(r"\d+(?:[.,:/]\d+)*")
+
+SIMHASH_BITS = 64
+BANDS = 4
+BAND_BITS = SIMHASH_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def _shingles(text: str, size: int) -> List[str]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    weights = [0] * SIMHASH_BITS
+    for shingle in _shingles(text, shingle_size):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def numeric_tokens(text: str) -> tuple:
+    # Fees, doses, phone numbers and times, in order of appearance
+    return tuple(_NUMBER_RE.findall(text))
+
+
+class NearDuplicateIndex:
+    def __init__(self, max_distance: int = 3, shingle_size: int = 3):
+        # With 4 bands, any pair within 3 differing bits shares at least one identical band
+        if max_distance >= BANDS:
+            raise ValueError(f"max_distance must be below {BANDS} for banded lookup")
+
+        self.max_distance = max_distance
+        self.shingle_size = shingle_size
+        self.fingerprints = []
+        self.numbers = []
+        self.bands = [defaultdict(list) for _ in range(BANDS)]
+        self.duplicates = 0
+        self.duplicate_chars = 0
+
+    def add(self, text: str) -> Optional[int]:
+        fingerprint = simhash(text, self.shingle_size)
+        numbers = numeric_tokens(text)
+        band_keys = [(fingerprint >> (band * BAND_BITS)) & BAND_MASK for band in range(BANDS)]
+
+        for band, key in enumerate(band_keys):
+            for candidate in self.bands[band].get(key, ()):
+                # A few changed digits barely move the fingerprint, but "$250" and "$350" are different
+                # answers, so chunks only collapse when their numbers match exactly
+                if (hamming_distance(fingerprint, self.fingerprints[candidate]) <= self.max_distance
+                        and self.numbers[candidate] == numbers):
+                    self.duplicates += 1
+                    self.duplicate_chars += len(text)
+                    return candidate
+
+        position = len(self.fingerprints)
+        self.fingerprints.append(fingerprint)
+        self.numbers.append(numbers)
+        for band, key in enumerate(band_keys):
+            self.bands[band][key].append(position)
+        return None
+
+    def stats(self, dimension: int = 384) -> dict:
+        return {
+            "unique": len(self.fingerprints),
+            "duplicates": self.duplicates,
+            "saved_vector_bytes": self.duplicates * dimension * 4,
+            "saved_text_chars": self.duplicate_chars,
+        }
+
+
+def find_near_duplicates(texts: List[str], max_distance: int = 3, shingle_size: int = 3) -> tuple:
+    # Returns (indices to keep, {duplicate index: index of the kept text it collapses into})
+    index = NearDuplicateIndex(max_distance=max_distance, shingle_size=shingle_size)
+    kept = []
+    duplicate_of = {}
+
+    for i, text in enumerate(texts):
+        canonical = index.add(text)
+        if canonical is None:
+            kept.append(i)
+        else:
+            duplicate_of[i] = kept[canonical]
+
+    return kept, duplicate_of
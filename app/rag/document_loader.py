@@ -0,0 +1,164 @@
+import io
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import engine
+from app.rag.corpus_version import bump_corpus_version
+from app.rag.metadata import METADATA_FIELDS, OFFSET_FIELDS, UNKNOWN_SOURCE, infer_metadata
+
+MODE_APPEND = "append"
+MODE_REPLACE = "replace"
+MODE_DIFF = "diff"
+
+COPY_BATCH_ROWS = 10000
+
+_COPY_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\r": "\\r",
+})
+
+
+def vector_literal(vector) -> str:
+    return "[" + ",".join(repr(float(value)) for value in vector) + "]"
+
+
+def _copy_rows(cursor, table: str, rows):
+    buffer = io.StringIO()
+    count = 0
+    columns = ", ".join(("content", "embedding") + METADATA_FIELDS + OFFSET_FIELDS)
+
+    def flush():
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT text)", buffer)
+        buffer.seek(0)
+        buffer.truncate()
+
+    for content, vector, metadata in rows:
+        embedding = vector_literal(vector) if vector is not None else "\\N"
+        labels = "\t".join(
+            "\\N" if metadata.get(field) is None else str(metadata[field]).translate(_COPY_ESCAPES)
+            for field in METADATA_FIELDS + OFFSET_FIELDS
+        )
+        buffer.write(f"{content.translate(_COPY_ESCAPES)}\t{embedding}\t{labels}\n")
+        count += 1
+        if count % COPY_BATCH_ROWS == 0:
+            flush()
+
+    if count % COPY_BATCH_ROWS:
+        flush()
+    return count
+
+
+def stage_documents(conn, contents, embeddings, metadatas) -> int:
+    # The staging table lives until the surrounding transaction commits, so several calls
+    # inside one transaction accumulate into a single load
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS documents_staging "
+            f"(content text NOT NULL, embedding vector({settings.EMBEDDING_DIMENSION}), "
+            f"{', '.join(f'{field} varchar' for field in METADATA_FIELDS)}, "
+            f"{', '.join(f'{field} integer' for field in OFFSET_FIELDS)}) ON COMMIT DROP"
+        )
+        return _copy_rows(cursor, "documents_staging", zip(contents, embeddings, metadatas))
+    finally:
+        cursor.close()
+
+
+def apply_staged_documents(conn, mode: str, sources: list = None) -> dict:
+    if mode not in (MODE_APPEND, MODE_REPLACE, MODE_DIFF):
+        raise ValueError(f"Unknown load mode: {mode}")
+
+    stats = {"claimed": 0, "inserted": 0, "updated": 0, "deleted": 0}
+
+    if mode == MODE_REPLACE:
+        stats["deleted"] = conn.execute(text("DELETE FROM documents")).rowcount
+
+    if mode == MODE_DIFF:
+        # A diff only reconciles the loader's own rows: documents from other sources are never
+        # touched, and the same text loaded by two sources is two rows
+        if sources is None:
+            sources = [row[0] for row in conn.execute(text("SELECT DISTINCT source FROM documents_staging"))]
+
+        # Rows loaded before sources were recorded belong to nobody: the first diff load that
+        # stages the same text claims one copy of it, instead of inserting a duplicate next to it
+        stats["claimed"] = conn.execute(text("""
+            UPDATE documents d
+            SET source = claim.source
+            FROM (
+                SELECT DISTINCT ON (s.content) s.content, s.source
+                FROM documents_staging s
+                ORDER BY s.content, s.source
+            ) claim
+            WHERE d.content = claim.content
+              AND d.id = (
+                  SELECT min(l.id) FROM documents l
+                  WHERE l.content = d.content AND (l.source IS NULL OR l.source = :unknown)
+              )
+              AND NOT EXISTS (
+                  SELECT 1 FROM documents o WHERE o.content = claim.content AND o.source = claim.source
+              )
+        """), {"unknown": UNKNOWN_SOURCE}).rowcount
+
+        stats["deleted"] = conn.execute(text("""
+            DELETE FROM documents d
+            WHERE d.source = ANY(:sources)
+              AND NOT EXISTS (
+                  SELECT 1 FROM documents_staging s WHERE s.content = d.content AND s.source = d.source
+              )
+        """), {"sources": sources}).rowcount
+        stats["updated"] = conn.execute(text("""
+            UPDATE documents d
+            SET embedding = s.embedding, department = s.department, doc_type = s.doc_type,
+                language = s.language, chunk_start = s.chunk_start, chunk_end = s.chunk_end
+            FROM documents_staging s
+            WHERE d.content = s.content AND d.source = s.source AND d.source = ANY(:sources)
+              AND (d.embedding, d.department, d.doc_type, d.language, d.chunk_start, d.chunk_end)
+                  IS DISTINCT FROM (s.embedding, s.department, s.doc_type, s.language, s.chunk_start, s.chunk_end)
+        """), {"sources": sources}).rowcount
+        stats["inserted"] = conn.execute(text("""
+            INSERT INTO documents (content, embedding, department, doc_type, language, source,
+                                   chunk_start, chunk_end)
+            SELECT DISTINCT ON (s.content, s.source)
+                   s.content, s.embedding, s.department, s.doc_type, s.language, s.source,
+                   s.chunk_start, s.chunk_end
+            FROM documents_staging s
+            WHERE NOT EXISTS (SELECT 1 FROM documents d WHERE d.content = s.content AND d.source = s.source)
+            ORDER BY s.content, s.source, s.chunk_start
+        """)).rowcount
+    else:
+        stats["inserted"] = conn.execute(text("""
+            INSERT INTO documents (content, embedding, department, doc_type, language, source,
+                                   chunk_start, chunk_end)
+            SELECT content, embedding, department, doc_type, language, source, chunk_start, chunk_end
+            FROM documents_staging
+        """)).rowcount
+
+    return stats
+
+
+def bulk_load_documents(contents, embeddings, mode: str = MODE_DIFF, bump_version: bool = True,
+                        bind=engine, metadatas=None, source: str = None) -> dict:
+    if mode not in (MODE_APPEND, MODE_REPLACE, MODE_DIFF):
+        raise ValueError(f"Unknown load mode: {mode}")
+
+    contents = list(contents)
+    if metadatas is None:
+        metadatas = [infer_metadata(content, source) for content in contents]
+
+    # One transaction: readers keep seeing the previous corpus until COMMIT, never an empty table
+    with bind.begin() as conn:
+        stats = {"staged": stage_documents(conn, contents, embeddings, metadatas)}
+        stats.update(apply_staged_documents(conn, mode, [source] if source else None))
+
+        changed = stats["claimed"] or stats["inserted"] or stats["updated"] or stats["deleted"]
+        if bump_version and changed:
+            session = Session(bind=conn)
+            try:
+                bump_corpus_version(session)
+            finally:
+                session.close()
+
+    return stats
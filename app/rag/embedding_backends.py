@@ -0,0 +1,116 @@
+import os
+from typing import List
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+
+BACKEND_HUGGINGFACE = "huggingface"
+BACKEND_ONNX = "onnx"
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class OnnxEmbeddings(Embeddings):
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, onnx_file: str = "onnx/model.onnx",
+                 local_path: str = None, max_length: int = 256, batch_size: int = 32, threads: int = 0):
+        # Imported here so the PyTorch backend never pays for onnxruntime and vice versa
+        import numpy as np
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = local_path or self._download(model_name, onnx_file)
+
+        self._np = np
+        self.max_length = max_length
+        self.batch_size = batch_size
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, onnx_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    @staticmethod
+    def _download(model_name: str, onnx_file: str) -> str:
+        from huggingface_hub import snapshot_download
+
+        return snapshot_download(
+            repo_id=model_name,
+            allow_patterns=[onnx_file, "tokenizer.json"]
+        )
+
+    def _encode_batch(self, texts: List[str]):
+        np = self._np
+        encodings = self.tokenizer.encode_batch(texts)
+
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Same head as the sentence-transformers model: mean pooling over real tokens, then L2 normalize
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._encode_batch(texts[start:start + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def get_embedding_model_name() -> str:
+    return settings.EMBEDDING_MODEL or DEFAULT_EMBEDDING_MODEL
+
+
+def worker_thread_budget(workers: int) -> int:
+    # Each pool process gets its share of the cores; N workers each running N intra-op threads
+    # oversubscribe the CPU and throughput stops scaling
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def get_embedding_backend(backend: str = None, model_name: str = None, threads: int = None) -> Embeddings:
+    # threads caps intra-op parallelism; pool workers pass their share of the cores
+    backend = backend or settings.EMBEDDING_BACKEND
+    model_name = model_name or get_embedding_model_name()
+    threads = threads or settings.EMBEDDING_THREADS
+
+    print(f" Loading embedding backend '{backend}' ({model_name})")
+
+    if backend == BACKEND_HUGGINGFACE:
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        if threads:
+            import torch
+
+            torch.set_num_threads(threads)
+
+        return HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={"device": "cpu"}
+        )
+
+    if backend == BACKEND_ONNX:
+        return OnnxEmbeddings(
+            model_name=model_name,
+            onnx_file=settings.EMBEDDING_ONNX_FILE,
+            local_path=settings.EMBEDDING_ONNX_PATH,
+            threads=threads,
+        )
+
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
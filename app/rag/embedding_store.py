@@ -0,0 +1,189 @@
+import hashlib
+import os
+import re
+import threading
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+from app.rag.embedding_backends import get_embedding_backend, get_embedding_model_name
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_UNSAFE_PATH_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PersistentEmbeddingCache:
+    def __init__(self, cache_dir: str, model_id: str, dimension: int):
+        self.model_id = model_id
+        self.dimension = dimension
+        self.path = os.path.join(cache_dir, _UNSAFE_PATH_RE.sub("_", model_id))
+        self.vectors_path = os.path.join(self.path, "vectors.f32")
+        self.index_path = os.path.join(self.path, "index.tsv")
+        self.lock_path = os.path.join(self.path, ".lock")
+        self._row_bytes = dimension * 4
+        self._rows = {}
+        self._index_offset = 0
+        self._matrix = None
+        self._lock = threading.Lock()
+
+        os.makedirs(self.path, exist_ok=True)
+        self._load_index()
+
+    def _file_rows(self) -> int:
+        if not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // self._row_bytes
+
+    def _load_index(self):
+        # Only the lines appended since the last call are parsed, so a write costs O(batch), not O(cache)
+        available = self._file_rows()
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as handle:
+                handle.seek(self._index_offset)
+                tail = handle.read()
+            # A line without its newline is a torn write; it is left unread and overwritten by the next one
+            complete = tail.rfind(b"\n") + 1
+            for line in tail[:complete].decode("utf-8").splitlines():
+                parts = line.split("\t")
+                # Index lines are written after their vectors; drop any a crash left dangling
+                if len(parts) == 2 and parts[1].isdigit() and int(parts[1]) < available:
+                    self._rows[parts[0]] = int(parts[1])
+            self._index_offset += complete
+        self._matrix = None
+
+    def _mapped(self):
+        if self._matrix is None:
+            rows = self._file_rows()
+            if rows == 0:
+                return None
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimension))
+        return self._matrix
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        with self._lock:
+            matrix = self._mapped()
+            results = []
+            for text in texts:
+                row = self._rows.get(content_hash(text))
+                if row is None or matrix is None or row >= len(matrix):
+                    results.append(None)
+                else:
+                    results.append(matrix[row].tolist())
+            return results
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        entries = {}
+        for text, vector in zip(texts, vectors):
+            key = content_hash(text)
+            if key not in self._rows:
+                entries[key] = vector
+        if not entries:
+            return
+
+        data = np.asarray(list(entries.values()), dtype=np.float32)
+        if data.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-d vectors, got {data.shape[1]}-d")
+
+        with self._lock, open(self.lock_path, "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another process may have appended since we loaded; pick up its rows first
+                self._load_index()
+                first_row = self._file_rows()
+
+                # Writes start at the last whole row / line, so a torn earlier write is overwritten
+                # instead of shifting every later vector away from its index row
+                for path in (self.vectors_path, self.index_path):
+                    if not os.path.exists(path):
+                        open(path, "wb").close()
+
+                with open(self.vectors_path, "r+b") as handle:
+                    handle.truncate(first_row * self._row_bytes)
+                    handle.seek(first_row * self._row_bytes)
+                    handle.write(data.tobytes())
+                    handle.flush()
+                    os.fsync(handle.fileno())
+
+                lines = "".join(f"{key}\t{first_row + offset}\n" for offset, key in enumerate(entries))
+                with open(self.index_path, "r+b") as handle:
+                    handle.truncate(self._index_offset)
+                    handle.seek(self._index_offset)
+                    handle.write(lines.encode("utf-8"))
+                self._index_offset += len(lines.encode("utf-8"))
+                for offset, key in enumerate(entries):
+                    self._rows[key] = first_row + offset
+
+                self._matrix = None
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class DiskCachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, cache: PersistentEmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.cache.get_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+        if missing:
+            computed = self.embeddings.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+            self.cache.put_many([texts[i] for i in missing], computed)
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def get_embedding_model_id(backend: str = None, model_name: str = None) -> str:
+    backend = backend or settings.EMBEDDING_BACKEND
+    model_id = f"{backend}-{model_name or get_embedding_model_name()}"
+    if backend == "onnx":
+        model_id += f"-{settings.EMBEDDING_ONNX_FILE}"
+    return model_id
+
+
+def get_stored_embedding_model_id(conn) -> Optional[str]:
+    # reembed_documents.py records the model on documents.embedding at cutover; None before any cutover
+    from sqlalchemy import text
+
+    return conn.execute(text("""
+        SELECT col_description('documents'::regclass, a.attnum)
+        FROM pg_attribute a
+        WHERE a.attrelid = 'documents'::regclass AND a.attname = 'embedding' AND NOT a.attisdropped
+    """)).scalar()
+
+
+def get_embedding_cache() -> PersistentEmbeddingCache:
+    return PersistentEmbeddingCache(
+        settings.EMBEDDING_STORE_DIR,
+        get_embedding_model_id(),
+        settings.EMBEDDING_DIMENSION
+    )
+
+
+def get_ingestion_embeddings() -> DiskCachedEmbeddings:
+    cache = get_embedding_cache()
+    print(f" Persistent embedding cache: {cache.path} ({len(cache)} vectors)")
+    return DiskCachedEmbeddings(get_embedding_backend(), cache)
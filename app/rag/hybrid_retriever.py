@@ -0,0 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from langchain_core.documents import Document as LCDocument
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lexical-search")
+
+
+def submit_lexical_search(index, query: str, k: int, partition: dict = None):
+    return _executor.submit(index.lexical_search, query, k, partition)
+
+
+def reciprocal_rank_fusion(ranked_lists: List[List[LCDocument]], k: int = 60) -> List[tuple]:
+    # Documents are matched across lists by content, since pgvector results carry no documents.id
+    scores = {}
+    docs = {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked, start=1):
+            key = doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            docs.setdefault(key, doc)
+
+    fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return [(docs[key], score) for key, score in fused]
@@ -1,20 +1,397 @@
+import threading
+import time
+import numpy as np
 from langchain_community.vectorstores import PGVector
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.documents import Document as LCDocument
 from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.rag.embedding_backends import get_embedding_backend
+from app.rag.embedding_cache import CachedEmbeddings
+from app.rag.embedding_store import get_embedding_model_id, get_stored_embedding_model_id
+from app.rag.embedding_batcher import BatchingEmbeddings
+from app.rag.memory_index import InMemoryVectorIndex
+from app.rag.pgvector_index import vector_search_connect_args
+from app.rag.answer_cache import SemanticAnswerCache
+from app.rag.corpus_version import get_corpus_version
+from app.rag.corpus_collections import collection_embedding_model, get_active_collection_name
+from app.rag.quantization import QUANTIZATION_BINARY, search_documents_binary
+from app.rag.hybrid_retriever import reciprocal_rank_fusion, submit_lexical_search
+from app.rag.query_router import route_query, to_pgvector_filter
 
 
 class LangChainRAG:
     def __init__(self):
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
+        self.batcher = BatchingEmbeddings(
+            get_embedding_backend(),
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+        )
+
+        self.embeddings = CachedEmbeddings(
+            self.batcher,
+            max_size=settings.EMBEDDING_CACHE_SIZE,
+            ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS,
         )
 
         self.vector_store = PGVector(
             connection_string=settings.DATABASE_URL,
-            collection_name="langchain",
+            collection_name=self._load_active_collection_name(),
             embedding_function=self.embeddings,
+            engine_args={"connect_args": vector_search_connect_args()},
         )
 
+        # The in-memory mirror also carries the BM25 index, so it is kept for hybrid search
+        # even when vector search itself goes to pgvector
+        self.memory_index = None
+        if settings.RETRIEVER_BACKEND == "memory" or settings.HYBRID_SEARCH:
+            self.memory_index = InMemoryVectorIndex(
+                self.embeddings,
+                mode=settings.MEMORY_INDEX_MODE,
+                refresh_interval_seconds=settings.MEMORY_INDEX_REFRESH_SECONDS,
+                build_lexical=settings.HYBRID_SEARCH,
+                quantization=settings.VECTOR_QUANTIZATION,
+                rerank_factor=settings.QUANTIZATION_RERANK_FACTOR,
+                model_id=get_embedding_model_id(),
+            )
+
+        self.answer_cache = None
+        if settings.ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                max_size=settings.ANSWER_CACHE_SIZE,
+                ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+                similarity_threshold=settings.ANSWER_CACHE_SIMILARITY,
+            )
+
+        self._corpus_version = None
+        self._corpus_version_checked_at = 0.0
+        self._collection_checked_at = time.monotonic()
+        self._stored_model_ok = True
+        self._stored_model_checked_at = 0.0
+
+    def _load_active_collection_name(self) -> str:
+        db = SessionLocal()
+        try:
+            return get_active_collection_name(db)
+        except Exception as e:
+            # corpus_collections may not exist yet on a fresh database
+            print(f" Could not read the active corpus collection: {e}")
+            return settings.CORPUS_COLLECTION_PREFIX
+        finally:
+            db.close()
+
+    def refresh_active_collection(self):
+        if time.monotonic() - self._collection_checked_at < settings.MEMORY_INDEX_REFRESH_SECONDS:
+            return
+        self._collection_checked_at = time.monotonic()
+
+        # PGVector resolves its collection by name on every query, so swapping the name is the switch;
+        # queries already running finish on the old collection, which is kept until a later GC
+        name = self._load_active_collection_name()
+        if name == self.vector_store.collection_name:
+            return
+
+        db = SessionLocal()
+        try:
+            collection_model = collection_embedding_model(db, name)
+        finally:
+            db.close()
+        if collection_model and collection_model != get_embedding_model_id():
+            # Queries are still encoded with this worker's model, so it stays on the collection
+            # that matches them until it is restarted
+            print(f" Collection '{name}' holds {collection_model} vectors but queries use "
+                  f"{get_embedding_model_id()}; staying on '{self.vector_store.collection_name}' until restart")
+            return
+
+        print(f" Switching retrieval from collection '{self.vector_store.collection_name}' to '{name}'")
+        self.vector_store.collection_name = name
+
+    def _stored_model_matches(self) -> bool:
+        # The binary search reads documents.embedding directly, which a re-embedding cutover
+        # can move to another model while this worker runs
+        if time.monotonic() - self._stored_model_checked_at >= settings.MEMORY_INDEX_REFRESH_SECONDS:
+            with engine.connect() as conn:
+                stored_model = get_stored_embedding_model_id(conn)
+            self._stored_model_ok = not stored_model or stored_model == get_embedding_model_id()
+            self._stored_model_checked_at = time.monotonic()
+        return self._stored_model_ok
+
+    def warm_up(self):
+        # A worker whose query model differs from the stored vectors would answer from noise
+        with engine.connect() as conn:
+            stored_model = get_stored_embedding_model_id(conn)
+        if stored_model and stored_model != get_embedding_model_id():
+            raise RuntimeError(
+                f"documents.embedding holds {stored_model} vectors, but EMBEDDING_* settings select "
+                f"{get_embedding_model_id()}"
+            )
+
+        # Run one encode so the model weights are loaded before the first user query
+        self.embeddings.embed_documents(["warm up"])
+
+        if self.memory_index is not None:
+            try:
+                self.memory_index.load()
+            except Exception as e:
+                print(f" Could not load in-memory index, using pgvector: {e}")
+
+    def corpus_version(self):
+        if self.memory_index is not None:
+            self.memory_index.refresh_if_stale()
+            if self.memory_index.version is not None:
+                return self.memory_index.version
+
+        if time.monotonic() - self._corpus_version_checked_at >= settings.MEMORY_INDEX_REFRESH_SECONDS:
+            db = SessionLocal()
+            try:
+                self._corpus_version = get_corpus_version(db)
+            finally:
+                db.close()
+            self._corpus_version_checked_at = time.monotonic()
+        return self._corpus_version
+
+    def get_cached_answer(self, query: str, language: str):
+        if self.answer_cache is None:
+            return None
+        try:
+            return self.answer_cache.get(self.embeddings.embed_query(query), language, self.corpus_version())
+        except Exception as e:
+            print(f" Answer cache lookup failed: {e}")
+            return None
+
+    def cache_answer(self, query: str, language: str, response: str):
+        if self.answer_cache is None:
+            return
+        try:
+            self.answer_cache.put(self.embeddings.embed_query(query), language, self.corpus_version(), response)
+        except Exception as e:
+            print(f" Answer cache store failed: {e}")
+
+    def _vector_search_with_scores(self, query: str, k: int, partition: dict = None) -> list:
+        if settings.RETRIEVER_BACKEND == "memory":
+            try:
+                self.memory_index.refresh_if_stale()
+                if self.memory_index.is_loaded:
+                    return self.memory_index.similarity_search_with_score(query, k=k, partition=partition)
+            except Exception as e:
+                print(f" In-memory retrieval failed, falling back to pgvector: {e}")
+
+        if settings.RETRIEVER_BACKEND == "pgvector" and settings.VECTOR_QUANTIZATION == QUANTIZATION_BINARY:
+            try:
+                return self._binary_search_with_scores(query, k, partition)
+            except Exception as e:
+                print(f" Binary-quantized search failed, falling back to PGVector collection: {e}")
+
+        self.refresh_active_collection()
+
+        # PGVector returns cosine distance; convert to similarity so both backends compare alike
+        search_filter = to_pgvector_filter(partition) if partition else None
+        return [
+            (doc, 1.0 - distance)
+            for doc, distance in self.vector_store.similarity_search_with_score(query, k=k, filter=search_filter)
+        ]
+
+    def _binary_search_with_scores(self, query: str, k: int, partition: dict = None) -> list:
+        if not self._stored_model_matches():
+            raise RuntimeError(f"documents.embedding no longer holds {get_embedding_model_id()} vectors")
+
+        db = SessionLocal()
+        try:
+            rows = search_documents_binary(
+                db,
+                self.embeddings.embed_query(query),
+                k,
+                rerank_factor=settings.QUANTIZATION_RERANK_FACTOR,
+                partition=partition,
+            )
+        finally:
+            db.close()
+
+        return [
+            (
+                LCDocument(
+                    page_content=content,
+                    metadata={"source": "medical_document", "topic": "medical", "document_id": doc_id},
+                ),
+                score,
+            )
+            for doc_id, content, score in rows
+        ]
+
+    def retrieve(self, query: str, k: int = None, threshold: float = None, partition: dict = None) -> list:
+        k = k or settings.TOP_K
+        threshold = settings.SIMILARITY_THRESHOLD if threshold is None else threshold
+
+        routed = False
+        if partition is None and settings.METADATA_ROUTING:
+            partition = route_query(query)
+            routed = partition is not None
+        if partition:
+            print(f" Searching partition {partition}")
+
+        results = self._retrieve_partition(query, k, threshold, partition)
+
+        # A router guess that finds nothing must never cost an answer the full corpus would give
+        if not results and routed:
+            print(" Nothing relevant in the routed partition, searching the whole corpus")
+            results = self._retrieve_partition(query, k, threshold, None)
+        return results
+
+    def _retrieve_partition(self, query: str, k: int, threshold: float, partition: dict = None) -> list:
+        candidates = max(k, settings.HYBRID_CANDIDATES)
+
+        lexical_future = None
+        if settings.HYBRID_SEARCH and self.memory_index is not None:
+            lexical_future = submit_lexical_search(self.memory_index, query, candidates, partition)
+
+        vector_results = self._vector_search_with_scores(query, candidates, partition)
+        ranked = [doc for doc, _ in vector_results]
+        similarities = {doc.page_content: score for doc, score in vector_results}
+
+        if lexical_future is not None:
+            try:
+                lexical_docs = [doc for doc, _ in lexical_future.result()]
+                missing = [doc for doc in lexical_docs if doc.page_content not in similarities]
+                similarities.update(self.memory_index.score_documents(query, missing))
+                ranked = [
+                    doc for doc, _ in reciprocal_rank_fusion([ranked, lexical_docs], k=settings.RRF_K)
+                ]
+            except Exception as e:
+                print(f" Lexical search failed, using vector results only: {e}")
+
+        scored = [(doc, similarities.get(doc.page_content, 0.0)) for doc in ranked]
+        return select_relevant(scored, k, threshold, settings.RETRIEVAL_SCORE_MARGIN)
+
+    def close(self):
+        self.batcher.close()
+
+
+def select_relevant(scored: list, k: int, threshold: float, margin: float) -> list:
+    relevant = [(doc, score) for doc, score in scored if score >= threshold]
+    if not relevant:
+        return []
+
+    # Adaptive k: drop chunks that trail the best match by more than the margin
+    best = max(score for _, score in relevant)
+    relevant = [(doc, score) for doc, score in relevant if score >= best - margin]
+    return relevant[:k]
+
+
+RAG_NOT_LOADED = "not_loaded"
+RAG_LOADING = "loading"
+RAG_READY = "ready"
+RAG_FAILED = "failed"
+
+_pipeline = None
+_pipeline_state = RAG_NOT_LOADED
+_pipeline_error = None
+_pipeline_lock = threading.Lock()
+
+
+def init_rag_pipeline() -> LangChainRAG:
+    global _pipeline, _pipeline_state, _pipeline_error
+
+    with _pipeline_lock:
+        if _pipeline is not None:
+            return _pipeline
+
+        _pipeline_state = RAG_LOADING
+        print(" Loading RAG pipeline (embedding model + vector store)...")
+
+        try:
+            pipeline = LangChainRAG()
+            pipeline.warm_up()
+        except Exception as e:
+            _pipeline_state = RAG_FAILED
+            _pipeline_error = str(e)
+            print(f" Failed to load RAG pipeline: {e}")
+            raise
+
+        _pipeline = pipeline
+        _pipeline_state = RAG_READY
+        _pipeline_error = None
+        print(" RAG pipeline ready")
+        return _pipeline
+
 
 def get_rag_pipeline() -> LangChainRAG:
-    return LangChainRAG()
+    if _pipeline is not None:
+        return _pipeline
+    return init_rag_pipeline()
+
+
+def shutdown_rag_pipeline():
+    global _pipeline, _pipeline_state
+
+    with _pipeline_lock:
+        if _pipeline is None:
+            return
+        _pipeline.close()
+        _pipeline = None
+        _pipeline_state = RAG_NOT_LOADED
+
+
+def is_rag_ready() -> bool:
+    return _pipeline_state == RAG_READY
+
+
+def get_rag_status() -> dict:
+    status = {
+        "state": _pipeline_state,
+        "error": _pipeline_error,
+    }
+    if _pipeline is not None:
+        status["collection"] = _pipeline.vector_store.collection_name
+        status["embedding_cache"] = _pipeline.embeddings.stats()
+        status["embedding_batcher"] = _pipeline.batcher.stats()
+        if _pipeline.answer_cache is not None:
+            status["answer_cache"] = _pipeline.answer_cache.stats()
+        if _pipeline.memory_index is not None:
+            status["memory_index"] = {
+                "mode": _pipeline.memory_index.mode,
+                "quantization": _pipeline.memory_index.quantization,
+                "hybrid": settings.HYBRID_SEARCH,
+                "loaded": _pipeline.memory_index.is_loaded,
+                "corpus_version": _pipeline.memory_index.version,
+            }
+    return status
+
+
+def calibrate_threshold(questions: list, negatives: list = None) -> dict:
+    # Top-1 cosine scores for in-domain questions (and optionally off-topic ones), unthresholded
+    pipeline = get_rag_pipeline()
+
+    def top_scores(queries):
+        scores = []
+        for query in queries:
+            scored = pipeline._retrieve_partition(query, settings.TOP_K, -1.0, None)
+            scores.append(max((score for _, score in scored), default=0.0))
+        return np.asarray(scores, dtype=np.float32)
+
+    positive = top_scores(questions)
+    report = {"questions": len(questions), "p10": float(np.percentile(positive, 10)),
+              "median": float(np.median(positive))}
+    if negatives:
+        negative = top_scores(negatives)
+        report["negatives_p90"] = float(np.percentile(negative, 90))
+        # Halfway between the weak in-domain matches and the strong off-topic ones
+        report["suggested_threshold"] = round((report["p10"] + report["negatives_p90"]) / 2, 3)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Measure retrieval scores to choose SIMILARITY_THRESHOLD")
+    parser.add_argument("questions", help="File with one in-domain question per line")
+    parser.add_argument("--negatives", help="File with one off-topic question per line")
+    args = parser.parse_args()
+
+    def read_lines(path):
+        with open(path, encoding="utf-8") as handle:
+            return [line.strip() for line in handle if line.strip()]
+
+    print(json.dumps(calibrate_threshold(
+        read_lines(args.questions), read_lines(args.negatives) if args.negatives else None
+    ), indent=2))
+    shutdown_rag_pipeline()
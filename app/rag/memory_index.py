@@ -0,0 +1,311 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Any, List, Optional
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document as LCDocument
+from langchain_core.retrievers import BaseRetriever
+from app.core.database import SessionLocal, engine
+from app.models.document import Document
+from app.rag.corpus_version import get_corpus_version
+from app.rag.embedding_store import get_stored_embedding_model_id
+from app.rag.lexical_index import BM25Index
+from app.rag.metadata import GENERAL, METADATA_FIELDS
+from app.rag.quantization import QUANTIZATION_NONE, QuantizedIndex
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+INDEX_MODE_EXACT = "exact"
+INDEX_MODE_HNSW = "hnsw"
+
+PARTITION_FIELDS = ("department", "doc_type")
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class _IndexSnapshot:
+    def __init__(self, version: int, ids: List[int], contents: List[str], matrix: np.ndarray, ann=None,
+                 lexical=None, quantized=None, metadatas: Optional[List[dict]] = None):
+        self.version = version
+        self.ids = ids
+        self.contents = contents
+        self.matrix = matrix
+        self.ann = ann
+        self.lexical = lexical
+        self.quantized = quantized
+        self.metadatas = metadatas or [{} for _ in ids]
+        self.positions = {doc_id: position for position, doc_id in enumerate(ids)}
+
+        # (field, value) -> row positions, so a routed query scans only its partition
+        partitions = defaultdict(list)
+        for position, metadata in enumerate(self.metadatas):
+            for field in PARTITION_FIELDS:
+                partitions[(field, metadata.get(field) or GENERAL)].append(position)
+        self.partitions = {key: np.asarray(rows, dtype=np.int64) for key, rows in partitions.items()}
+
+    def partition_positions(self, partition: dict) -> np.ndarray:
+        # partition maps a field to its allowed values, e.g. {"department": ["cardiology", "general"]}
+        selected = None
+        for field, values in partition.items():
+            rows = [self.partitions.get((field, value)) for value in values]
+            rows = [r for r in rows if r is not None]
+            positions = np.unique(np.concatenate(rows)) if rows else np.zeros(0, dtype=np.int64)
+            selected = positions if selected is None else np.intersect1d(selected, positions)
+        return selected if selected is not None else np.arange(len(self.ids))
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class InMemoryVectorIndex:
+    def __init__(self, embeddings, mode: str = INDEX_MODE_EXACT, refresh_interval_seconds: float = 30,
+                 hnsw_m: int = 16, hnsw_ef_construction: int = 200, hnsw_ef_search: int = 64,
+                 build_lexical: bool = True, quantization: str = QUANTIZATION_NONE, rerank_factor: int = 10,
+                 model_id: Optional[str] = None):
+        if mode == INDEX_MODE_HNSW and hnswlib is None:
+            print(" hnswlib is not installed, falling back to exact in-memory search")
+            mode = INDEX_MODE_EXACT
+
+        self.embeddings = embeddings
+        self.mode = mode
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.hnsw_ef_search = hnsw_ef_search
+        self.build_lexical = build_lexical
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self.model_id = model_id
+        self._snapshot = None
+        self._last_version_check = 0.0
+        self._reload_lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        snapshot = self._snapshot
+        return snapshot is not None and len(snapshot) > 0
+
+    @property
+    def version(self) -> Optional[int]:
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else None
+
+    def load(self):
+        db = SessionLocal()
+        try:
+            version = get_corpus_version(db)
+            rows = (
+                db.query(
+                    Document.id, Document.content, Document.embedding,
+                    Document.department, Document.doc_type, Document.language, Document.source
+                )
+                .filter(Document.embedding.isnot(None))
+                .order_by(Document.id)
+                .yield_per(1000)
+            )
+
+            ids = []
+            contents = []
+            vectors = []
+            metadatas = []
+            for doc_id, content, embedding, *labels in rows:
+                ids.append(doc_id)
+                contents.append(content)
+                vectors.append(embedding)
+                metadatas.append(dict(zip(METADATA_FIELDS, labels)))
+        finally:
+            db.close()
+
+        if vectors:
+            matrix = np.ascontiguousarray(_normalize_rows(np.asarray(vectors, dtype=np.float32)))
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+
+        ann = self._build_ann(matrix) if len(ids) else None
+        lexical = BM25Index(contents) if self.build_lexical else None
+        quantized = None
+        if self.quantization != QUANTIZATION_NONE and ann is None and len(ids):
+            quantized = QuantizedIndex(matrix, mode=self.quantization, rerank_factor=self.rerank_factor)
+            # Exact partition scans and rescoring read the memory-mapped copy; the float32 array is freed
+            matrix = quantized.matrix
+
+        # Swap in one assignment so concurrent searches see either the old or the new corpus
+        self._snapshot = _IndexSnapshot(version, ids, contents, matrix, ann, lexical, quantized, metadatas)
+        self._last_version_check = time.monotonic()
+        print(f" In-memory index loaded: {len(ids)} vectors, corpus version {version}, mode {self.mode}")
+
+    def _build_ann(self, matrix: np.ndarray):
+        if self.mode != INDEX_MODE_HNSW:
+            return None
+
+        ann = hnswlib.Index(space="ip", dim=matrix.shape[1])
+        ann.init_index(
+            max_elements=matrix.shape[0],
+            M=self.hnsw_m,
+            ef_construction=self.hnsw_ef_construction
+        )
+        ann.add_items(matrix, np.arange(matrix.shape[0]))
+        ann.set_ef(self.hnsw_ef_search)
+        return ann
+
+    def _stored_model_id(self) -> Optional[str]:
+        if not self.model_id:
+            return None
+        with engine.connect() as conn:
+            return get_stored_embedding_model_id(conn)
+
+    def refresh_if_stale(self):
+        if time.monotonic() - self._last_version_check < self.refresh_interval_seconds:
+            return
+
+        if not self._reload_lock.acquire(blocking=False):
+            return
+
+        try:
+            db = SessionLocal()
+            try:
+                version = get_corpus_version(db)
+            finally:
+                db.close()
+
+            self._last_version_check = time.monotonic()
+            if self._snapshot is None or version != self._snapshot.version:
+                stored_model = self._stored_model_id()
+                if self.model_id and stored_model and stored_model != self.model_id:
+                    # After a re-embedding cutover this worker still encodes queries with the old model,
+                    # so it keeps serving the snapshot that matches them until it is restarted
+                    print(f" documents.embedding now holds {stored_model} vectors but queries use "
+                          f"{self.model_id}; keeping corpus version {self.version} until restart")
+                    return
+                print(f" Corpus version changed ({self.version} -> {version}), reloading in-memory index")
+                self.load()
+        except Exception as e:
+            print(f" Error refreshing in-memory index: {e}")
+        finally:
+            self._reload_lock.release()
+
+    def search_by_vector(self, query_vector, k: int, snapshot: Optional[_IndexSnapshot] = None,
+                         partition: Optional[dict] = None) -> List[tuple]:
+        snapshot = snapshot or self._snapshot
+        if snapshot is None or len(snapshot) == 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        if partition:
+            # A partition is a small slice of the corpus, so it is scanned exactly rather than through the ANN
+            positions = snapshot.partition_positions(partition)
+            if len(positions) == 0:
+                return []
+            scores = snapshot.matrix[positions] @ query
+            top = np.argsort(-scores)[:k]
+            return [(int(positions[i]), float(scores[i])) for i in top]
+
+        k = min(k, len(snapshot))
+
+        if snapshot.ann is not None:
+            labels, distances = snapshot.ann.knn_query(query, k=k)
+            # hnswlib "ip" distance is 1 - dot product
+            return [
+                (int(label), float(1.0 - distance))
+                for label, distance in zip(labels[0], distances[0])
+            ]
+
+        if snapshot.quantized is not None:
+            return snapshot.quantized.search(query, k)
+
+        scores = snapshot.matrix @ query
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def _to_document(self, snapshot: _IndexSnapshot, position: int) -> LCDocument:
+        metadata = {
+            "source": "medical_document",
+            "topic": "medical",
+            "document_id": snapshot.ids[position],
+        }
+        metadata.update({field: value for field, value in snapshot.metadatas[position].items() if value})
+        return LCDocument(page_content=snapshot.contents[position], metadata=metadata)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, partition: Optional[dict] = None) -> List[tuple]:
+        self.refresh_if_stale()
+        snapshot = self._snapshot
+        query_vector = self.embeddings.embed_query(query)
+
+        return [
+            (self._to_document(snapshot, position), score)
+            for position, score in self.search_by_vector(query_vector, k, snapshot, partition)
+        ]
+
+    def score_documents(self, query: str, docs: List[LCDocument]) -> dict:
+        snapshot = self._snapshot
+        if snapshot is None or len(snapshot) == 0:
+            return {}
+
+        positions = [snapshot.positions.get(doc.metadata.get("document_id")) for doc in docs]
+        known = [(doc, position) for doc, position in zip(docs, positions) if position is not None]
+        if not known:
+            return {}
+
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if norm:
+            query_vector = query_vector / norm
+
+        scores = snapshot.matrix[[position for _, position in known]] @ query_vector
+        return {doc.page_content: float(score) for (doc, _), score in zip(known, scores)}
+
+    def lexical_search(self, query: str, k: int = 10, partition: Optional[dict] = None) -> List[tuple]:
+        self.refresh_if_stale()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.lexical is None:
+            return []
+
+        allowed = set(snapshot.partition_positions(partition).tolist()) if partition else None
+        return [
+            (self._to_document(snapshot, position), score)
+            for position, score in snapshot.lexical.search(query, k, allowed=allowed)
+        ]
+
+    def similarity_search(self, query: str, k: int = 4) -> List[LCDocument]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def as_retriever(self, k: int = 4, fallback: Optional[BaseRetriever] = None) -> "InMemoryRetriever":
+        return InMemoryRetriever(index=self, k=k, fallback=fallback)
+
+
+class InMemoryRetriever(BaseRetriever):
+    index: Any
+    k: int = 4
+    fallback: Optional[BaseRetriever] = None
+
+    def _get_relevant_documents(
+            self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[LCDocument]:
+        try:
+            self.index.refresh_if_stale()
+            if self.index.is_loaded:
+                return self.index.similarity_search(query, k=self.k)
+        except Exception as e:
+            if self.fallback is None:
+                raise
+            print(f" In-memory retrieval failed, falling back to pgvector: {e}")
+
+        if self.fallback is None:
+            return []
+        return self.fallback.invoke(query)
@@ -0,0 +1,165 @@
+import os
+import re
+from sqlalchemy import text
+from app.core.database import engine
+
+# Documents that match no department (hospital-wide information) belong to this partition,
+# and every routed search includes it
+GENERAL = "general"
+
+# Rows loaded before sources were recorded are backfilled with this
+UNKNOWN_SOURCE = "unknown"
+
+METADATA_FIELDS = ("department", "doc_type", "language", "source")
+
+# Character offsets of a chunk within the text extracted from its source file
+OFFSET_FIELDS = ("chunk_start", "chunk_end")
+
+DEPARTMENT_KEYWORDS = {
+    "cardiology": ["cardiology", "cardiac", "cardiologist", "heart", "ecg", "electrocardiogram",
+                   "echocardiography", "angioplasty", "stent", "pacemaker", "holter", "catheterization",
+                   "coronary"],
+    "neurology": ["neurology", "neurologist", "neurosurgery", "stroke", "epilepsy", "eeg",
+                  "electroencephalogram", "brain", "craniotomy", "lumbar puncture"],
+    "orthopedics": ["orthopedic", "orthopaedic", "knee", "hip replacement", "joint replacement", "joint pain", "acl", "rotator cuff",
+                    "meniscus", "arthroscopic", "fracture", "sports medicine", "spine surgery"],
+    "oncology": ["oncology", "oncologist", "cancer", "chemotherapy", "radiation therapy", "tumor", "tumour"],
+    "gastroenterology": ["gastroenterology", "gastro", "gi", "ibd", "endoscopy", "colonoscopy", "liver", "digestive"],
+    "pulmonology": ["pulmonology", "pulmonary", "respiratory", "lung", "asthma", "bronchoscopy", "copd"],
+    "obstetrics_gynecology": ["obstetrics", "gynecology", "gynaecology", "pregnancy", "prenatal", "maternity",
+                              "delivery", "cesarean", "ivf"],
+    "pediatrics": ["pediatric", "paediatric", "pediatrics", "child", "children", "infant", "newborn", "nicu"],
+    "dermatology": ["dermatology", "dermatologist", "skin", "acne", "eczema", "psoriasis", "botox"],
+    "psychiatry": ["psychiatry", "psychiatric", "psychiatrist", "mental health", "depression", "anxiety",
+                   "therapy session", "counseling"],
+    "emergency": ["emergency department", "emergency room", "trauma center", "ambulance"],
+    "icu": ["intensive care", "icu", "critical care", "ventilator"],
+    "diagnostics": ["diagnostic", "radiology", "mri", "ct scan", "x-ray", "ultrasound", "pet scan",
+                    "mammography"],
+    "laboratory": ["laboratory", "lab test", "blood test", "cbc", "lipid profile", "urine test", "biopsy"],
+    "surgery": ["surgical", "surgery", "laparoscopic", "appendectomy", "hernia", "operation theater"],
+    "rehabilitation": ["rehabilitation", "physiotherapy", "physical therapy", "occupational therapy"],
+    "pharmacy": ["pharmacy", "pharmacist", "prescription", "medication delivery"],
+    "dental": ["dental", "dentist", "tooth", "teeth", "root canal", "orthodontic"],
+    "vaccination": ["vaccination", "vaccine", "immunization", "flu shot"],
+}
+
+DOC_TYPE_KEYWORDS = {
+    "fees": ["fee", "fees", "cost", "costs", "price", "prices", "charge", "charges", "$", "payment",
+             "discount", "insurance", "copay", "how much"],
+    "schedule": ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday", "hours",
+                 "timing", "timings", "open", "24/7", "am to", "pm", "when"],
+    "contact": ["phone", "call", "email", "contact", "address", "located", "location", "www.", "+1-"],
+    "staff": ["dr.", "doctor", "led by", "headed by", "directed by", "specialist", "surgeon", "experience"],
+}
+
+_DEVANAGARI_RE = re.compile(r"[\u0900-\u097F]")
+_SOURCE_SPLIT_RE = re.compile(r"[_\-.\s/\\]+")
+
+
+def _keyword_pattern(keywords: list):
+    # Whole-word matches on alphanumeric edges, so "art" never matches "heart" but "$" matches "$250"
+    alternatives = []
+    for keyword in keywords:
+        before = r"(?<!\w)" if keyword[0].isalnum() else ""
+        after = r"(?!\w)" if keyword[-1].isalnum() else ""
+        alternatives.append(before + re.escape(keyword) + after)
+    return re.compile("|".join(alternatives))
+
+
+_DEPARTMENT_PATTERNS = {label: _keyword_pattern(keywords) for label, keywords in DEPARTMENT_KEYWORDS.items()}
+_DOC_TYPE_PATTERNS = {label: _keyword_pattern(keywords) for label, keywords in DOC_TYPE_KEYWORDS.items()}
+
+
+def _best_match(text: str, patterns: dict):
+    text = text.lower()
+    best, best_hits = None, 0
+    for label, pattern in patterns.items():
+        hits = len(pattern.findall(text))
+        if hits > best_hits:
+            best, best_hits = label, hits
+    return best
+
+
+def detect_department(text: str):
+    return _best_match(text, _DEPARTMENT_PATTERNS)
+
+
+def detect_doc_type(text: str):
+    return _best_match(text, _DOC_TYPE_PATTERNS)
+
+
+def detect_language(text: str) -> str:
+    return "hi" if _DEVANAGARI_RE.search(text) else "en"
+
+
+def infer_metadata(text: str, source: str = None) -> dict:
+    department = detect_department(text)
+    if department is None and source:
+        # A file named after a department (e.g. cardiology_fees.pdf) labels its chunks
+        department = detect_department(" ".join(_SOURCE_SPLIT_RE.split(os.path.basename(source))))
+
+    return {
+        "department": department or GENERAL,
+        "doc_type": detect_doc_type(text) or GENERAL,
+        "language": detect_language(text),
+        "source": source or UNKNOWN_SOURCE,
+    }
+
+
+def ensure_metadata_columns(bind=engine):
+    # create_all() never alters an existing table, so the partition columns are added here. Every
+    # worker runs this at startup, and ALTER TABLE / CREATE INDEX lock the table even when there is
+    # nothing to do, so only what is actually missing is issued
+    columns = {field: "varchar" for field in METADATA_FIELDS}
+    columns.update({field: "integer" for field in OFFSET_FIELDS})
+
+    with bind.begin() as conn:
+        existing = {
+            row[0] for row in conn.execute(text("""
+                SELECT column_name FROM information_schema.columns
+                WHERE table_name = 'documents' AND table_schema = ANY(current_schemas(false))
+            """))
+        }
+        for field, column_type in columns.items():
+            if field not in existing:
+                conn.execute(text(f"ALTER TABLE documents ADD COLUMN IF NOT EXISTS {field} {column_type}"))
+
+        indexes = {"ix_documents_partition": "documents (department, doc_type)"}
+        if conn.execute(text("SELECT to_regclass('langchain_pg_embedding')")).scalar() is not None:
+            for field in ("department", "doc_type"):
+                indexes[f"ix_langchain_pg_embedding_{field}"] = f"langchain_pg_embedding ((cmetadata->>'{field}'))"
+
+        for name, definition in indexes.items():
+            if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}"))
+
+
+def backfill_document_metadata(bind=engine, batch_size: int = 1000) -> int:
+    updated = 0
+    while True:
+        with bind.begin() as conn:
+            rows = conn.execute(text("""
+                SELECT id, content, source FROM documents
+                WHERE department IS NULL ORDER BY id LIMIT :limit
+            """), {"limit": batch_size}).all()
+            if not rows:
+                return updated
+
+            params = []
+            for doc_id, content, source in rows:
+                metadata = infer_metadata(content, source)
+                metadata["id"] = doc_id
+                params.append(metadata)
+            conn.execute(text("""
+                UPDATE documents
+                SET department = :department, doc_type = :doc_type, language = :language, source = :source
+                WHERE id = :id
+            """), params)
+            updated += len(rows)
+            print(f"  Labelled {updated} documents")
+
+
+if __name__ == "__main__":
+    ensure_metadata_columns()
+    print(f"Backfilled partition metadata for {backfill_document_metadata()} documents")
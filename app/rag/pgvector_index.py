@@ -0,0 +1,191 @@
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import engine
+
+INDEX_TYPE_HNSW = "hnsw"
+INDEX_TYPE_IVFFLAT = "ivfflat"
+INDEX_TYPE_NONE = "none"
+
+# (table, column) pairs that get an ANN index
+VECTOR_COLUMNS = [
+    ("documents", "embedding"),
+    ("langchain_pg_embedding", "embedding"),
+]
+
+
+def ensure_vector_extension(bind=engine):
+    with bind.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+
+
+def _index_prefix(table: str, column: str) -> str:
+    return f"ix_{table}_{column}_"
+
+
+def _index_name(table: str, column: str) -> str:
+    # Build parameters are part of the name so a config change is detected as a different index
+    if settings.VECTOR_INDEX_TYPE == INDEX_TYPE_HNSW:
+        suffix = f"hnsw_m{settings.VECTOR_INDEX_HNSW_M}_ef{settings.VECTOR_INDEX_HNSW_EF_CONSTRUCTION}"
+    else:
+        suffix = f"ivfflat_l{settings.VECTOR_INDEX_IVFFLAT_LISTS}"
+    return _index_prefix(table, column) + suffix
+
+
+def _index_ddl(table: str, column: str, name: str) -> str:
+    if settings.VECTOR_INDEX_TYPE == INDEX_TYPE_HNSW:
+        return (
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+            f"USING hnsw ({column} vector_cosine_ops) "
+            f"WITH (m = {settings.VECTOR_INDEX_HNSW_M}, "
+            f"ef_construction = {settings.VECTOR_INDEX_HNSW_EF_CONSTRUCTION})"
+        )
+    return (
+        f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+        f"USING ivfflat ({column} vector_cosine_ops) "
+        f"WITH (lists = {settings.VECTOR_INDEX_IVFFLAT_LISTS})"
+    )
+
+
+def _table_exists(conn, table: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:t)"), {"t": table}).scalar() is not None
+
+
+def _fix_untyped_column(conn, table: str, column: str):
+    # langchain creates its embedding column as plain "vector"; ANN indexes need a fixed dimension
+    typmod = conn.execute(text("""
+        SELECT a.atttypmod FROM pg_attribute a
+        WHERE a.attrelid = CAST(:t AS regclass) AND a.attname = :c
+    """), {"t": table, "c": column}).scalar()
+
+    if typmod is not None and typmod < 0:
+        print(f"  Setting {table}.{column} to vector({settings.EMBEDDING_DIMENSION})")
+        conn.execute(text(
+            f"ALTER TABLE {table} ALTER COLUMN {column} "
+            f"TYPE vector({settings.EMBEDDING_DIMENSION})"
+        ))
+
+
+def _existing_indexes(conn, table: str, column: str) -> list:
+    rows = conn.execute(text("""
+        SELECT indexname FROM pg_indexes
+        WHERE tablename = :t AND indexname LIKE :p
+    """), {"t": table, "p": _index_prefix(table, column) + "%"})
+    return [row[0] for row in rows]
+
+
+def ensure_vector_indexes(bind=engine, rebuild: bool = False):
+    if settings.VECTOR_QUANTIZATION == "binary":
+        ensure_binary_quantized_index(bind)
+
+    if settings.VECTOR_INDEX_TYPE == INDEX_TYPE_NONE:
+        print(" Vector index management disabled (VECTOR_INDEX_TYPE=none)")
+        return
+
+    if settings.VECTOR_INDEX_TYPE not in (INDEX_TYPE_HNSW, INDEX_TYPE_IVFFLAT):
+        raise ValueError(f"Unknown VECTOR_INDEX_TYPE: {settings.VECTOR_INDEX_TYPE}")
+
+    for table, column in VECTOR_COLUMNS:
+        with bind.begin() as conn:
+            if not _table_exists(conn, table):
+                print(f" Skipping vector index on {table}: table does not exist yet")
+                continue
+
+            _fix_untyped_column(conn, table, column)
+
+            name = _index_name(table, column)
+            for existing in _existing_indexes(conn, table, column):
+                if existing != name or rebuild:
+                    print(f"  Dropping stale vector index {existing}")
+                    conn.execute(text(f"DROP INDEX IF EXISTS {existing}"))
+
+            if settings.VECTOR_INDEX_TYPE == INDEX_TYPE_IVFFLAT:
+                rows = conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+                if rows == 0:
+                    # IVFFlat clusters existing rows; building it on an empty table gives useless lists
+                    print(f" Skipping IVFFlat index on {table}: no rows yet")
+                    continue
+
+            print(f" Ensuring vector index {name}")
+            conn.execute(text(_index_ddl(table, column, name)))
+
+
+# Outside the ix_documents_embedding_ prefix, so a re-embedding in progress never loses its index
+SHADOW_INDEX_NAME = "ix_documents_reembed_hnsw"
+
+
+def ensure_shadow_vector_index(conn, column: str):
+    if settings.VECTOR_INDEX_TYPE == INDEX_TYPE_NONE:
+        return
+    print(f" Ensuring vector index {SHADOW_INDEX_NAME} on documents.{column}")
+    conn.execute(text(_index_ddl("documents", column, SHADOW_INDEX_NAME)))
+
+
+def promote_shadow_vector_index(conn):
+    # Called inside the cutover transaction, after the shadow column has been renamed to embedding
+    for existing in _existing_indexes(conn, "documents", "embedding"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {existing}"))
+    conn.execute(text(f"DROP INDEX IF EXISTS {BINARY_INDEX_NAME}"))
+
+    if settings.VECTOR_INDEX_TYPE != INDEX_TYPE_NONE:
+        conn.execute(text(
+            f"ALTER INDEX IF EXISTS {SHADOW_INDEX_NAME} RENAME TO {_index_name('documents', 'embedding')}"
+        ))
+
+
+def collection_index_name(version: int) -> str:
+    # Outside the ix_langchain_pg_embedding_embedding_ prefix, so the loop above leaves it alone
+    return f"ix_corpus_v{version}_embedding"
+
+
+def ensure_collection_index(conn, version: int, collection_uuid: str):
+    # Partial index over one collection: built before the switch, so the new version is fast from its first query
+    if settings.VECTOR_INDEX_TYPE == INDEX_TYPE_NONE:
+        return
+
+    name = collection_index_name(version)
+    print(f" Ensuring vector index {name}")
+    conn.execute(text(
+        _index_ddl("langchain_pg_embedding", "embedding", name)
+        + f" WHERE collection_id = '{collection_uuid}'"
+    ))
+
+
+def drop_collection_index(conn, version: int):
+    conn.execute(text(f"DROP INDEX IF EXISTS {collection_index_name(version)}"))
+
+
+# Deliberately outside the ix_documents_embedding_ prefix so the loop above never drops it
+BINARY_INDEX_NAME = "ix_documents_binary_embedding_hnsw"
+
+
+def ensure_binary_quantized_index(bind=engine):
+    # Needs pgvector >= 0.7 for binary_quantize() and bit_hamming_ops
+    with bind.begin() as conn:
+        if not _table_exists(conn, "documents"):
+            return
+        print(f" Ensuring binary-quantized vector index {BINARY_INDEX_NAME}")
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {BINARY_INDEX_NAME} ON documents "
+            f"USING hnsw ((binary_quantize(embedding)::bit({settings.EMBEDDING_DIMENSION})) bit_hamming_ops)"
+        ))
+
+
+def vector_search_connect_args() -> dict:
+    return {
+        "options": (
+            f"-c hnsw.ef_search={settings.VECTOR_SEARCH_HNSW_EF_SEARCH} "
+            f"-c ivfflat.probes={settings.VECTOR_SEARCH_IVFFLAT_PROBES}"
+        )
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    rebuild = "--rebuild" in sys.argv
+    print("=" * 60)
+    print(f"MANAGING PGVECTOR INDEXES ({settings.VECTOR_INDEX_TYPE}, rebuild={rebuild})")
+    print("=" * 60)
+    ensure_vector_extension()
+    ensure_vector_indexes(rebuild=rebuild)
+    print("Done.")
@@ -0,0 +1,235 @@
+import tempfile
+import time
+from typing import List
+import numpy as np
+from sqlalchemy import text
+
+QUANTIZATION_NONE = "none"
+QUANTIZATION_INT8 = "int8"
+QUANTIZATION_BINARY = "binary"
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# int8 codes are widened to float32 this many rows at a time, so scoring never allocates a
+# float32 copy of the whole corpus
+INT8_SCORE_CHUNK_ROWS = 4096
+
+
+def quantize_int8(matrix: np.ndarray):
+    # Symmetric per-dimension scale so each dimension uses the full int8 range
+    scale = np.abs(matrix).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8)
+    return codes, scale.astype(np.float32)
+
+
+def binarize(matrix: np.ndarray) -> np.ndarray:
+    bits = np.packbits(matrix > 0, axis=-1)
+    # Padded to whole 64-bit words so distances can be computed a word, not a byte, at a time
+    padding = -bits.shape[-1] % 8
+    if padding:
+        bits = np.concatenate([bits, np.zeros(bits.shape[:-1] + (padding,), dtype=np.uint8)], axis=-1)
+    return np.ascontiguousarray(bits).view(np.uint64)
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    xor = np.bitwise_xor(codes, query_code)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[xor.view(np.uint8)].sum(axis=1, dtype=np.int32)
+
+
+def spill_to_disk(matrix: np.ndarray, directory: str = None):
+    # The rerank rows live in an unlinked temp file: the OS pages in the few rows a query touches
+    # and can evict them again, instead of the process holding the whole float32 corpus
+    handle = tempfile.TemporaryFile(dir=directory)
+    mapped = np.memmap(handle, dtype=np.float32, mode="w+", shape=matrix.shape)
+    mapped[:] = matrix
+    mapped.flush()
+    return handle, mapped
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top])]
+
+
+class QuantizedIndex:
+    def __init__(self, matrix: np.ndarray, mode: str = QUANTIZATION_BINARY, rerank_factor: int = 10,
+                 spill_dir: str = None, spill: bool = True):
+        if mode not in (QUANTIZATION_INT8, QUANTIZATION_BINARY):
+            raise ValueError(f"Unknown quantization mode: {mode}")
+
+        self.mode = mode
+        self.rerank_factor = rerank_factor
+
+        if mode == QUANTIZATION_INT8:
+            self.codes, self.scale = quantize_int8(matrix)
+        else:
+            self.codes = binarize(matrix)
+            self.scale = None
+
+        # Full-precision rows are only touched for the rerank candidates, so they are memory-mapped
+        self._spill_file = None
+        self.matrix = matrix
+        if spill and len(matrix):
+            self._spill_file, self.matrix = spill_to_disk(matrix, spill_dir)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def candidates(self, query: np.ndarray, count: int) -> np.ndarray:
+        count = min(count, len(self.codes))
+
+        if self.mode == QUANTIZATION_INT8:
+            # Dot product in the scaled code space equals query . dequantized(row)
+            scaled = (query * self.scale).astype(np.float32)
+            scores = np.empty(len(self.codes), dtype=np.float32)
+            # Per call, since concurrent searches share the index
+            chunk = np.empty((min(INT8_SCORE_CHUNK_ROWS, len(self.codes)), self.codes.shape[1]), dtype=np.float32)
+            for start in range(0, len(self.codes), len(chunk)):
+                block = self.codes[start:start + len(chunk)]
+                widened = chunk[:len(block)]
+                np.copyto(widened, block, casting="unsafe")
+                np.matmul(widened, scaled, out=scores[start:start + len(block)])
+            return _top_k(scores, count)
+
+        distances = hamming_distances(self.codes, binarize(query))
+        return _top_k(-distances.astype(np.float32), count)
+
+    def search(self, query: np.ndarray, k: int) -> List[tuple]:
+        candidates = self.candidates(query, k * self.rerank_factor)
+        # Sorted positions read the memory-mapped rows front to back
+        candidates = np.sort(candidates)
+        scores = self.matrix[candidates] @ query
+        order = np.argsort(-scores)[:k]
+        return [(int(candidates[i]), float(scores[i])) for i in order]
+
+
+PARTITION_COLUMNS = ("department", "doc_type", "language", "source")
+
+# pgvector rejects hnsw.ef_search above this
+HNSW_EF_SEARCH_LIMIT = 1000
+
+
+def search_documents_binary(db, query_vector, k: int, rerank_factor: int = 10,
+                            partition: dict = None) -> List[tuple]:
+    # Hamming candidates from the binary_quantize() expression index, then float rerank in SQL
+    vector_literal = "[" + ",".join(f"{value:.7f}" for value in query_vector) + "]"
+    params = {"q": vector_literal, "candidates": k * rerank_factor, "k": k}
+
+    partition_sql = ""
+    for field, values in (partition or {}).items():
+        if field not in PARTITION_COLUMNS:
+            raise ValueError(f"Unknown partition field: {field}")
+        partition_sql += f" AND {field} = ANY(:{field})"
+        params[field] = list(values)
+
+    # An HNSW scan returns at most ef_search rows, so a candidate pool above it would silently shrink;
+    # set_config(..., true) is SET LOCAL, scoped to the transaction the query below runs in
+    db.execute(text("""
+        SELECT set_config(
+            'hnsw.ef_search',
+            LEAST(GREATEST(:candidates, current_setting('hnsw.ef_search', true)::int), :limit)::text,
+            true
+        )
+    """), {"candidates": params["candidates"], "limit": HNSW_EF_SEARCH_LIMIT})
+
+    rows = db.execute(text(f"""
+        SELECT id, content, 1 - (embedding <=> CAST(:q AS vector)) AS score
+        FROM (
+            SELECT id, content, embedding
+            FROM documents
+            WHERE embedding IS NOT NULL{partition_sql}
+            ORDER BY binary_quantize(embedding)::bit({len(query_vector)})
+                <~> binary_quantize(CAST(:q AS vector))
+            LIMIT :candidates
+        ) candidates
+        ORDER BY embedding <=> CAST(:q AS vector)
+        LIMIT :k
+    """), params)
+    return [(row.id, row.content, float(row.score)) for row in rows]
+
+
+def benchmark(matrix: np.ndarray, k: int = 3, rerank_factor: int = 10, queries: int = 200) -> dict:
+    # Each sampled row is used as a query; recall is measured against exact search on the same matrix
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(matrix), size=min(queries, len(matrix)), replace=False)
+    k = min(k, len(matrix))
+
+    exact_results = []
+    start = time.perf_counter()
+    for i in sample:
+        exact_results.append(set(_top_k(matrix @ matrix[i], k).tolist()))
+    exact_ms = (time.perf_counter() - start) * 1000 / len(sample)
+
+    report = {
+        "vectors": len(matrix),
+        "float32_bytes": matrix.nbytes,
+        "exact_ms_per_query": round(exact_ms, 4),
+    }
+
+    for mode in (QUANTIZATION_INT8, QUANTIZATION_BINARY):
+        index = QuantizedIndex(matrix, mode=mode, rerank_factor=rerank_factor)
+        hits = 0
+        start = time.perf_counter()
+        for i, expected in zip(sample, exact_results):
+            found = {position for position, _ in index.search(matrix[i], k)}
+            hits += len(found & expected)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / len(sample)
+
+        report[mode] = {
+            "code_bytes": index.nbytes,
+            "ms_per_query": round(elapsed_ms, 4),
+            f"recall@{k}": round(hits / (len(sample) * k), 4),
+        }
+
+    return report
+
+
+def synthetic_corpus(count: int, dimension: int = 384, clusters: int = 200, noise: float = 0.35) -> np.ndarray:
+    # Clustered unit vectors: closer to real sentence embeddings than isotropic noise, which is
+    # the worst case for sign-bit codes
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    matrix = centers[rng.integers(0, clusters, count)] + noise * rng.standard_normal((count, dimension)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.ascontiguousarray(matrix)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Compare exact, int8 and binary search on the documents corpus")
+    parser.add_argument("--synthetic", type=int, help="Benchmark this many synthetic vectors instead of the database")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--rerank-factor", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        corpus = synthetic_corpus(args.synthetic)
+    else:
+        from app.core.database import SessionLocal
+        from app.models.document import Document
+
+        db = SessionLocal()
+        try:
+            vectors = [
+                embedding for (embedding,) in
+                db.query(Document.embedding).filter(Document.embedding.isnot(None)).yield_per(1000)
+            ]
+        finally:
+            db.close()
+
+        if not vectors:
+            raise SystemExit("No embedded documents found.")
+        corpus = np.asarray(vectors, dtype=np.float32)
+        corpus /= np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+        corpus = np.ascontiguousarray(corpus)
+
+    print(json.dumps(benchmark(corpus, k=args.k, rerank_factor=args.rerank_factor), indent=2))
@@ -0,0 +1,15 @@
+from typing import Optional
+from app.rag.metadata import GENERAL, detect_department
+
+
+def route_query(query: str) -> Optional[dict]:
+    # Only the department narrows the search: doc-type labels are too coarse to filter on safely
+    # (a rehab programme with a price and a timetable is labelled one or the other, not both)
+    department = detect_department(query)
+    if department is None:
+        return None
+    return {"department": [department, GENERAL]}
+
+
+def to_pgvector_filter(partition: dict) -> dict:
+    return {field: {"in": values} for field, values in partition.items()}
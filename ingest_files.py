@@ -0,0 +1,233 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED, wait
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.database import engine
+from app.rag.chunker import iter_chunk_spans
+from app.rag.corpus_version import bump_corpus_version
+from app.rag.document_loader import apply_staged_documents, stage_documents, MODE_DIFF
+from app.rag.embedding_backends import worker_thread_budget
+from app.rag.embedding_store import get_embedding_cache
+from app.rag.dedup import NearDuplicateIndex
+from app.rag.metadata import infer_metadata
+from app.core.config import settings
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+DOCX_PARAGRAPHS_PER_BLOCK = 50
+TXT_BLOCK_CHARS = 64 * 1024
+
+_worker_model = None
+
+
+def iter_files(root: str):
+    # Absolute paths, so a file keeps the same source however the directory is named on the command line
+    root = os.path.abspath(root)
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield os.path.join(dirpath, filename)
+
+
+def extract_pages(path: str):
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".pdf":
+        from PyPDF2 import PdfReader
+
+        reader = PdfReader(path)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+
+    elif extension == ".docx":
+        import docx
+
+        block = []
+        for paragraph in docx.Document(path).paragraphs:
+            block.append(paragraph.text)
+            if len(block) >= DOCX_PARAGRAPHS_PER_BLOCK:
+                yield "\n".join(block)
+                block = []
+        if block:
+            yield "\n".join(block)
+
+    else:
+        with open(path, encoding="utf-8", errors="ignore") as handle:
+            block = []
+            size = 0
+            for line in handle:
+                block.append(line)
+                size += len(line)
+                if size >= TXT_BLOCK_CHARS:
+                    yield "".join(block)
+                    block = []
+                    size = 0
+            if block:
+                yield "".join(block)
+
+
+def iter_chunk_batches(root: str, batch_size: int, chunk_size: int, overlap: int, dedup_index=None):
+    # Yields (texts, origins): every chunk keeps the file it came from and its (start, end)
+    # character offsets in the text extracted from that file
+    batch = []
+    origins = []
+    for path in iter_files(root):
+        logger.info(f"Reading {path}")
+        # Pages are streamed through the chunker so chunks can span page breaks
+        pages = (page_text + "\n\n" for page_text in extract_pages(path))
+        for span in iter_chunk_spans(pages, max_tokens=chunk_size, overlap_tokens=overlap, min_chars=50):
+            # Near-duplicates collapse into the first copy and never reach the embedding workers
+            if dedup_index is not None and dedup_index.add(span.text) is not None:
+                continue
+            batch.append(span.text)
+            origins.append((path, span.start, span.end))
+            if len(batch) >= batch_size:
+                yield batch, origins
+                batch = []
+                origins = []
+    if batch:
+        yield batch, origins
+
+
+def _init_worker(threads: int):
+    global _worker_model
+    from app.rag.embedding_backends import get_embedding_backend
+
+    _worker_model = get_embedding_backend(threads=threads)
+
+
+def _embed_batch(texts: list, origins: list) -> tuple:
+    return texts, origins, _worker_model.embed_documents(texts)
+
+
+def write_batch(conn, texts: list, vectors: list, origins: list):
+    metadatas = []
+    for text, (source, chunk_start, chunk_end) in zip(texts, origins):
+        metadata = infer_metadata(text, source)
+        metadata.update(chunk_start=chunk_start, chunk_end=chunk_end)
+        metadatas.append(metadata)
+    stage_documents(conn, texts, vectors, metadatas)
+
+
+def directory_sources(conn, root: str) -> list:
+    # Every file under root, including ones deleted since the last run, so their chunks are removed
+    prefix = os.path.join(os.path.abspath(root), "")
+    stored = conn.execute(
+        text("SELECT DISTINCT source FROM documents WHERE left(source, length(:prefix)) = :prefix"),
+        {"prefix": prefix}
+    )
+    return sorted(set(iter_files(root)) | {row[0] for row in stored})
+
+
+def ingest_directory(root: str, batch_size: int = 64, workers: int = None, chunk_size: int = 128,
+                     overlap: int = 24):
+    workers = workers or os.cpu_count() or 1
+    # Bounds memory: at most this many batches are extracted but not yet written
+    max_in_flight = workers * 2
+
+    logger.info("=" * 80)
+    logger.info(f"INGESTING FILES FROM {root} ({workers} embedding workers)")
+    logger.info("=" * 80)
+
+    cache = get_embedding_cache()
+    dedup_index = NearDuplicateIndex(settings.DEDUP_MAX_DISTANCE) if settings.DEDUP_ENABLED else None
+    total = 0
+    cached_total = 0
+    start = time.perf_counter()
+
+    # Batches are staged in one transaction and reconciled against this directory's rows at the end,
+    # so a re-run only changes what changed and readers never see a half-loaded directory
+    try:
+        pool_args = {"max_workers": workers, "initializer": _init_worker, "initargs": (worker_thread_budget(workers),)}
+        with engine.begin() as conn, ProcessPoolExecutor(**pool_args) as pool:
+            # Creates the staging table even when the directory is now empty, so its rows are removed
+            stage_documents(conn, [], [], [])
+            pending = set()
+
+            def written(count):
+                nonlocal total
+                total += count
+                elapsed = time.perf_counter() - start
+                logger.info(f"Staged {total} chunks ({total / elapsed:.1f} chunks/sec, {cached_total} from cache)")
+
+            def drain(return_when):
+                nonlocal pending
+                done, pending = wait(pending, return_when=return_when)
+                for future in done:
+                    texts, origins, vectors = future.result()
+                    # Only the parent process appends to the cache, so workers never contend on it
+                    cache.put_many(texts, vectors)
+                    write_batch(conn, texts, vectors, origins)
+                    written(len(texts))
+
+            for batch, origins in iter_chunk_batches(root, batch_size, chunk_size, overlap, dedup_index):
+                cached = cache.get_many(batch)
+                hits = [i for i, vector in enumerate(cached) if vector is not None]
+                missing = [i for i, vector in enumerate(cached) if vector is None]
+
+                if hits:
+                    cached_total += len(hits)
+                    write_batch(conn, [batch[i] for i in hits], [cached[i] for i in hits], [origins[i] for i in hits])
+                    written(len(hits))
+
+                if missing:
+                    pending.add(pool.submit(_embed_batch, [batch[i] for i in missing], [origins[i] for i in missing]))
+                if len(pending) >= max_in_flight:
+                    drain(FIRST_COMPLETED)
+
+            if pending:
+                drain(ALL_COMPLETED)
+
+            stats = apply_staged_documents(conn, MODE_DIFF, directory_sources(conn, root))
+            logger.info(
+                f"Loaded: {stats['claimed']} legacy rows claimed, {stats['inserted']} inserted, "
+                f"{stats['updated']} updated, {stats['deleted']} deleted"
+            )
+            if stats["claimed"] or stats["inserted"] or stats["updated"] or stats["deleted"]:
+                session = Session(bind=conn)
+                try:
+                    bump_corpus_version(session)
+                finally:
+                    session.close()
+    except Exception:
+        logger.exception("Ingestion failed, existing documents left unchanged")
+        raise
+
+    elapsed = time.perf_counter() - start
+    logger.info("=" * 80)
+    logger.info(f"INGESTED {total} CHUNKS IN {elapsed:.1f}s")
+    if dedup_index is not None and dedup_index.duplicates:
+        stats = dedup_index.stats(settings.EMBEDDING_DIMENSION)
+        logger.info(
+            f"Dedup: {stats['duplicates']} near-duplicate chunks skipped, "
+            f"saving {stats['saved_vector_bytes']} vector bytes per index "
+            f"and ~{stats['duplicates'] * elapsed / max(total, 1):.1f}s of embedding time"
+        )
+    logger.info("=" * 80)
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest PDF, DOCX and TXT files into the documents table")
+    parser.add_argument("directory", help="Directory to scan recursively")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedding batch")
+    parser.add_argument("--workers", type=int, default=None, help="Embedding processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=128, help="Max tokens per chunk")
+    parser.add_argument("--overlap", type=int, default=24, help="Overlap tokens between chunks")
+    args = parser.parse_args()
+
+    ingest_directory(
+        args.directory,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        overlap=args.overlap
+    )
@@ -1,7 +1,17 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.database import Base, engine
 from app.api import chat_routes, user_routes
+from app.rag.pgvector_index import ensure_vector_extension, ensure_vector_indexes
+from app.rag.metadata import ensure_metadata_columns
+from app.core.llm import close_llm_clients
+from app.rag.langchain_rag_FINAL import (
+    init_rag_pipeline,
+    shutdown_rag_pipeline,
+    get_rag_status,
+    is_rag_ready,
+)
 import os
 
 # Import models to ensure they're registered
@@ -9,6 +19,7 @@ from app.models.user import User
 from app.models.chat import Chat
 from app.models.consent import Consent
 from app.models.document import Document
+from app.models.corpus import CorpusVersion, CorpusCollection
 
 try:
     from app.logic import user_summary as user_summary_module
@@ -36,7 +47,14 @@ app.add_middleware(
 @app.on_event("startup")
 def startup_event():
     try:
+        ensure_vector_extension(engine)
         Base.metadata.create_all(bind=engine)
+        ensure_metadata_columns(engine)
+
+        try:
+            ensure_vector_indexes(engine)
+        except Exception as e:
+            print(f"Warning: Could not create vector indexes: {e}")
         #
         # print("=" * 60)
         # print(" DATABASE INITIALIZED SUCCESSFULLY!")
@@ -47,6 +65,12 @@ def startup_event():
         # print("  • consents")
         # print("  • user_summaries")
         # print("  • documents")
+
+        try:
+            init_rag_pipeline()
+        except Exception as e:
+            print(f"Warning: RAG pipeline not loaded at startup, will retry on first request: {e}")
+
         print("=" * 60)
         print("Medical RAG Assistant is ready!")
         print("=" * 60)
@@ -61,10 +85,12 @@ def startup_event():
         print("=" * 60)
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
     print("=" * 60)
     print(" Medical RAG Assistant shutting down...")
     print("=" * 60)
+    shutdown_rag_pipeline()
+    await close_llm_clients()
 
 app.include_router(chat_routes.router, tags=["chat"])
 app.include_router(user_routes.router, tags=["health"])
@@ -77,9 +103,11 @@ def read_root():
         "status": "running",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "docs": "/docs",
             "login": "/login",
-            "chat": "/chat"
+            "chat": "/chat",
+            "chat_stream": "/chat/stream"
         }
     }
 
@@ -91,6 +119,12 @@ def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/ready")
+def readiness_check():
+    rag_status = get_rag_status()
+    status_code = 200 if is_rag_ready() else 503
+    return JSONResponse(status_code=status_code, content={"rag": rag_status})
+
 if __name__ == "__main__":
     import uvicorn
 
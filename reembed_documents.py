@@ -0,0 +1,243 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED, wait
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import engine
+from app.rag.corpus_version import bump_corpus_version
+from app.rag.document_loader import vector_literal
+from app.rag.embedding_backends import get_embedding_backend, worker_thread_budget
+from app.rag.embedding_store import PersistentEmbeddingCache, get_embedding_model_id
+from app.rag.pgvector_index import ensure_shadow_vector_index, promote_shadow_vector_index, ensure_vector_indexes
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Vectors for the configured model land here while readers keep using documents.embedding.
+#
+# The cutover swaps the stored vectors, not the query model of running API workers, so it is
+# coupled to a restart: after --cutover, re-run ingest_langchain.py and restart the API with the
+# new EMBEDDING_* settings. Until then, workers keep serving their in-memory snapshot of the old
+# vectors, while pgvector and LangChain searches compare old-model queries with new vectors.
+# Only models with the current EMBEDDING_DIMENSION are supported: documents.embedding and
+# langchain_pg_embedding.embedding are both typed vector(EMBEDDING_DIMENSION).
+SHADOW_COLUMN = "embedding_next"
+
+_worker_model = None
+
+
+def column_comment(conn, column: str):
+    return conn.execute(text("""
+        SELECT col_description('documents'::regclass, a.attnum)
+        FROM pg_attribute a
+        WHERE a.attrelid = 'documents'::regclass AND a.attname = :column AND NOT a.attisdropped
+    """), {"column": column}).first()
+
+
+def prepare_shadow_column(model_id: str, restart: bool = False):
+    with engine.begin() as conn:
+        current_type = conn.execute(text("""
+            SELECT format_type(a.atttypid, a.atttypmod)
+            FROM pg_attribute a
+            WHERE a.attrelid = 'documents'::regclass AND a.attname = 'embedding' AND NOT a.attisdropped
+        """)).scalar()
+        if current_type != f"vector({settings.EMBEDDING_DIMENSION})":
+            raise RuntimeError(
+                f"documents.embedding is {current_type} but EMBEDDING_DIMENSION is "
+                f"{settings.EMBEDDING_DIMENSION}; re-embedding only supports models of the current dimension"
+            )
+
+        existing = column_comment(conn, SHADOW_COLUMN)
+
+        # The column comment records which model the shadow vectors came from
+        if existing is not None and (restart or existing[0] != model_id):
+            logger.info(f"Dropping shadow column built for {existing[0]}")
+            conn.execute(text(f"ALTER TABLE documents DROP COLUMN {SHADOW_COLUMN}"))
+            existing = None
+
+        if existing is None:
+            # Adding a nullable column is a catalog-only change: no table rewrite, no long lock
+            conn.execute(text(
+                f"ALTER TABLE documents ADD COLUMN {SHADOW_COLUMN} vector({settings.EMBEDDING_DIMENSION})"
+            ))
+            conn.execute(text(f"COMMENT ON COLUMN documents.{SHADOW_COLUMN} IS '{model_id}'"))
+
+
+def count_remaining(conn) -> tuple:
+    return conn.execute(text(f"""
+        SELECT count(*), count(*) FILTER (WHERE {SHADOW_COLUMN} IS NULL) FROM documents
+    """)).one()
+
+
+def iter_pending_batches(batch_size: int):
+    # Keyset pagination over rows without a shadow vector; progress lives in the column itself,
+    # so a restarted job simply continues with whatever is still NULL
+    last_id = 0
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(text(f"""
+                SELECT id, content FROM documents
+                WHERE {SHADOW_COLUMN} IS NULL AND id > :last_id
+                ORDER BY id LIMIT :limit
+            """), {"last_id": last_id, "limit": batch_size}).all()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield [row[0] for row in rows], [row[1] for row in rows]
+
+
+def write_vectors(conn, ids: list, vectors: list):
+    conn.execute(
+        text(f"UPDATE documents SET {SHADOW_COLUMN} = CAST(:embedding AS vector) WHERE id = :id"),
+        [{"id": doc_id, "embedding": vector_literal(vector)} for doc_id, vector in zip(ids, vectors)]
+    )
+
+
+def _init_worker(threads: int):
+    global _worker_model
+    _worker_model = get_embedding_backend(threads=threads)
+
+
+def _embed_batch(ids: list, texts: list) -> tuple:
+    return ids, texts, _worker_model.embed_documents(texts)
+
+
+def reembed(batch_size: int = 256, workers: int = None, restart: bool = False) -> int:
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2
+    model_id = get_embedding_model_id()
+    cache = PersistentEmbeddingCache(settings.EMBEDDING_STORE_DIR, model_id, settings.EMBEDDING_DIMENSION)
+
+    prepare_shadow_column(model_id, restart=restart)
+    with engine.connect() as conn:
+        total, remaining = count_remaining(conn)
+
+    logger.info("=" * 80)
+    logger.info(f"RE-EMBEDDING {remaining}/{total} DOCUMENTS WITH {model_id} ({workers} workers)")
+    logger.info("=" * 80)
+
+    done = 0
+    cached_total = 0
+    start = time.perf_counter()
+
+    def checkpoint(ids, vectors):
+        nonlocal done
+        # Each batch commits on its own: it is the checkpoint an interrupted run resumes from
+        with engine.begin() as conn:
+            write_vectors(conn, ids, vectors)
+        done += len(ids)
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed else 0.0
+        eta = (remaining - done) / rate if rate else 0.0
+        logger.info(
+            f"Re-embedded {done}/{remaining} ({rate:.1f} docs/sec, {cached_total} from cache, ETA {eta:.0f}s)"
+        )
+
+    pool = ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(worker_thread_budget(workers),)
+    )
+    with pool:
+        pending = set()
+
+        def drain(return_when):
+            nonlocal pending
+            finished, pending = wait(pending, return_when=return_when)
+            for future in finished:
+                ids, texts, vectors = future.result()
+                if vectors and len(vectors[0]) != settings.EMBEDDING_DIMENSION:
+                    raise ValueError(
+                        f"{model_id} returns {len(vectors[0])}-d vectors, "
+                        f"EMBEDDING_DIMENSION is {settings.EMBEDDING_DIMENSION}"
+                    )
+                cache.put_many(texts, vectors)
+                checkpoint(ids, vectors)
+
+        for ids, texts in iter_pending_batches(batch_size):
+            cached = cache.get_many(texts)
+            hits = [i for i, vector in enumerate(cached) if vector is not None]
+            misses = [i for i, vector in enumerate(cached) if vector is None]
+
+            if hits:
+                cached_total += len(hits)
+                checkpoint([ids[i] for i in hits], [cached[i] for i in hits])
+            if misses:
+                pending.add(pool.submit(_embed_batch, [ids[i] for i in misses], [texts[i] for i in misses]))
+            if len(pending) >= max_in_flight:
+                drain(FIRST_COMPLETED)
+
+        if pending:
+            drain(ALL_COMPLETED)
+
+    with engine.begin() as conn:
+        ensure_shadow_vector_index(conn, SHADOW_COLUMN)
+
+    elapsed = time.perf_counter() - start
+    logger.info("=" * 80)
+    logger.info(f"RE-EMBEDDED {done} DOCUMENTS IN {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f} docs/sec)")
+    logger.info("Run with --cutover to switch documents.embedding to the new vectors")
+    logger.info("=" * 80)
+    return done
+
+
+def cutover():
+    model_id = get_embedding_model_id()
+
+    with engine.begin() as conn:
+        comment = column_comment(conn, SHADOW_COLUMN)
+        if comment is None or comment[0] != model_id:
+            raise RuntimeError(f"No shadow column for {model_id}; run the re-embedding job first")
+
+        # Writers wait for the switch, readers keep going until the brief rename below
+        conn.execute(text("LOCK TABLE documents IN SHARE ROW EXCLUSIVE MODE"))
+
+        _, missing = count_remaining(conn)
+        if missing:
+            # Rows written by loaders since the last pass: embed them under the lock
+            rows = conn.execute(text(f"SELECT id, content FROM documents WHERE {SHADOW_COLUMN} IS NULL")).all()
+            logger.info(f"Embedding {len(rows)} documents added since the last pass")
+            model = get_embedding_backend()
+            write_vectors(conn, [row[0] for row in rows], model.embed_documents([row[1] for row in rows]))
+
+        conn.execute(text("ALTER TABLE documents RENAME COLUMN embedding TO embedding_previous"))
+        conn.execute(text(f"ALTER TABLE documents RENAME COLUMN {SHADOW_COLUMN} TO embedding"))
+        # API workers compare this with their own query model at startup and on corpus refresh
+        conn.execute(text(f"COMMENT ON COLUMN documents.embedding IS '{model_id}'"))
+        promote_shadow_vector_index(conn)
+        conn.execute(text("ALTER TABLE documents DROP COLUMN embedding_previous"))
+
+        # Cached answers and in-memory snapshots were computed with the old vectors
+        session = Session(bind=conn)
+        try:
+            bump_corpus_version(session)
+        finally:
+            session.close()
+
+    ensure_vector_indexes()
+
+    logger.info("=" * 80)
+    logger.info(f"documents.embedding now holds {model_id} vectors")
+    logger.info("Now re-run ingest_langchain.py, then restart every API worker with the same EMBEDDING_* settings;")
+    logger.info("until they restart, workers keep answering from their snapshot of the old vectors")
+    logger.info("=" * 80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Re-embed documents with the configured EMBEDDING_MODEL into a shadow column, then cut over"
+    )
+    parser.add_argument("--batch-size", type=int, default=256, help="Documents per embedding batch")
+    parser.add_argument("--workers", type=int, default=None, help="Embedding processes (default: CPU count)")
+    parser.add_argument("--restart", action="store_true", help="Discard shadow vectors and start over")
+    parser.add_argument("--cutover", action="store_true", help="Switch documents.embedding to the shadow vectors")
+    args = parser.parse_args()
+
+    if args.cutover:
+        cutover()
+    else:
+        reembed(batch_size=args.batch_size, workers=args.workers, restart=args.restart)
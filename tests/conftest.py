@@ -0,0 +1,6 @@
+import os
+import sys
+
+# app.core.database builds its engine at import time; unit tests never connect through it
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,24 @@
+from app.rag.chunker import count_tokens_regex, iter_chunk_spans
+
+TEXT = "Cardiology fee is $250. Follow-up is $150!  Emergency is $350?\n\nNeurology head is Dr. Sarah Chen. " * 20
+
+
+def pieces(text: str, size: int):
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+
+def test_span_offsets_point_at_the_chunk_text():
+    spans = list(iter_chunk_spans(TEXT, max_tokens=40, overlap_tokens=10, count_tokens=count_tokens_regex))
+
+    assert len(spans) > 1
+    for span in spans:
+        assert TEXT[span.start:span.end] == span.text
+
+
+def test_streamed_source_gives_the_same_spans():
+    whole = list(iter_chunk_spans(TEXT, max_tokens=40, overlap_tokens=10, count_tokens=count_tokens_regex))
+    streamed = list(iter_chunk_spans(pieces(TEXT, 7), max_tokens=40, overlap_tokens=10,
+                                     count_tokens=count_tokens_regex))
+
+    assert streamed == whole
@@ -0,0 +1,47 @@
+from app.rag.dedup import NearDuplicateIndex, find_near_duplicates, hamming_distance, numeric_tokens, simhash
+
+FEES = (
+    "Cardiology consultation at BTC Hospital costs $250 for new patients and $150 for follow-up visits. "
+    "The department is led by Dr. Sarah Chen and offers ECG, echocardiography, stress testing, Holter "
+    "monitoring and cardiac catheterization. Appointments can be booked online or by calling the front desk, "
+    "and walk-in patients are seen on weekday mornings. Payment is accepted by card, cash or insurance at the "
+    "front desk on the ground floor. Patients should bring previous reports, a list of current medications "
+    "and a photo ID to every visit. Parking is free for the first two hours and wheelchairs are available at "
+    "the main entrance. Interpreters for Hindi, Tamil and Bengali can be requested when booking. Fasting is "
+    "not needed for a routine consultation, but blood tests ordered on the day may require it. Reports from "
+    "outside laboratories are reviewed at no extra charge. Senior citizens and hospital staff receive a "
+    "discount on consultation fees. Cancellations made a day in advance are refunded in full, and "
+    "rescheduling is free. The cardiology ward has a dedicated pharmacy counter, a waiting lounge with "
+    "refreshments and a children's play area, and nurses are available around the clock for questions."
+)
+RAISED_FEES = FEES.replace("$250", "$310")
+
+
+def test_numeric_tokens_keep_order_and_separators():
+    assert numeric_tokens("Dose 2.5 mg at 08:30, call +1-555-0100") == ("2.5", "08:30", "1", "555", "0100")
+
+
+def test_chunks_differing_only_in_numbers_are_kept():
+    # The fingerprints alone would collapse the two fee lists
+    assert hamming_distance(simhash(FEES), simhash(RAISED_FEES)) <= 3
+
+    kept, duplicate_of = find_near_duplicates([FEES, RAISED_FEES])
+    assert kept == [0, 1]
+    assert duplicate_of == {}
+
+
+def test_reformatted_chunk_with_the_same_numbers_collapses():
+    reformatted = FEES.upper().replace(". ", ".\n")
+    kept, duplicate_of = find_near_duplicates([FEES, RAISED_FEES, reformatted])
+
+    assert kept == [0, 1]
+    assert duplicate_of == {2: 0}
+
+
+def test_index_counts_only_collapsed_chunks():
+    index = NearDuplicateIndex()
+    assert index.add(FEES) is None
+    assert index.add(RAISED_FEES) is None
+    assert index.add(FEES) == 0
+    assert index.add(RAISED_FEES) == 1
+    assert index.stats()["duplicates"] == 2
@@ -0,0 +1,72 @@
+import os
+import pytest
+from sqlalchemy import create_engine, text
+from app.core.config import settings
+from app.core.database import Base
+from app.models.corpus import CorpusVersion
+from app.models.document import Document
+from app.rag.document_loader import MODE_DIFF, bulk_load_documents
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+SCHEMA = "document_loader_test"
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="needs TEST_DATABASE_URL (PostgreSQL with pgvector)")
+
+
+@pytest.fixture
+def engine():
+    admin = create_engine(TEST_DATABASE_URL)
+    with admin.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+    bind = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={SCHEMA},public"})
+    Base.metadata.create_all(bind, tables=[Document.__table__, CorpusVersion.__table__])
+    yield bind
+
+    bind.dispose()
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    admin.dispose()
+
+
+def vector(seed: int) -> list:
+    return [float(seed)] + [0.0] * (settings.EMBEDDING_DIMENSION - 1)
+
+
+def rows(bind) -> list:
+    with bind.connect() as conn:
+        return conn.execute(text("SELECT content, source FROM documents ORDER BY content, source")).all()
+
+
+@pytest.mark.parametrize("legacy_source", [None, "unknown"])
+def test_diff_load_claims_source_less_rows_instead_of_duplicating(engine, legacy_source):
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO documents (content, source) VALUES (:content, :source)"),
+            [
+                {"content": "Cardiology is on floor 3", "source": legacy_source},
+                {"content": "Old fee list", "source": legacy_source},
+                {"content": "Chunk from a file", "source": "/data/guide.pdf"},
+            ]
+        )
+
+    contents = ["Cardiology is on floor 3", "ICU is open 24/7"]
+    stats = bulk_load_documents(contents, [vector(1), vector(2)], mode=MODE_DIFF, bind=engine,
+                                bump_version=False, source="btc_hospital_sample")
+
+    assert stats["claimed"] == 1
+    assert stats["inserted"] == 1
+    # Unclaimed legacy rows and other loaders' rows are left alone
+    assert rows(engine) == [
+        ("Cardiology is on floor 3", "btc_hospital_sample"),
+        ("Chunk from a file", "/data/guide.pdf"),
+        ("ICU is open 24/7", "btc_hospital_sample"),
+        ("Old fee list", legacy_source),
+    ]
+
+    # A second identical load is a no-op
+    stats = bulk_load_documents(contents, [vector(1), vector(2)], mode=MODE_DIFF, bind=engine,
+                                bump_version=False, source="btc_hospital_sample")
+    assert stats == {"staged": 2, "claimed": 0, "inserted": 0, "updated": 0, "deleted": 0}
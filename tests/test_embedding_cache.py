@@ -0,0 +1,26 @@
+from langchain_core.embeddings import Embeddings
+from app.rag.embedding_cache import CachedEmbeddings
+
+
+class RecordingEmbeddings(Embeddings):
+    def __init__(self):
+        self.queries = []
+
+    def embed_documents(self, texts):
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [float(len(text))]
+
+
+def test_query_is_embedded_as_written_and_cached_by_normalized_key():
+    backend = RecordingEmbeddings()
+    embeddings = CachedEmbeddings(backend)
+
+    first = embeddings.embed_query("  What is the OPD   timing for Cardiology? ")
+    second = embeddings.embed_query("what is the opd timing for cardiology?")
+
+    assert backend.queries == ["  What is the OPD   timing for Cardiology? "]
+    assert second == first
+    assert embeddings.stats()["hits"] == 1
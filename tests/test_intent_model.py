@@ -0,0 +1,28 @@
+import numpy as np
+from app.core.config import settings
+from app.logic import intent_model
+from app.rag.embedding_store import get_embedding_model_id
+
+
+def test_unreadable_model_falls_back_and_is_retried(tmp_path, monkeypatch):
+    path = tmp_path / "intent_model.npz"
+    path.write_bytes(b"not a model")
+    monkeypatch.setattr(settings, "INTENT_CLASSIFIER", "local")
+    monkeypatch.setattr(settings, "INTENT_MODEL_PATH", str(path))
+    monkeypatch.setattr(intent_model, "_classifier", None)
+    monkeypatch.setattr(intent_model, "_classifier_loaded", False)
+    monkeypatch.setattr(intent_model, "_classifier_failed_at", None)
+
+    assert intent_model.get_intent_classifier() is None
+    assert intent_model._classifier_loaded is False
+
+    intent_model.NearestCentroidIntentClassifier(
+        ["MEDICAL", "OTHER"], np.eye(2, dtype=np.float32), get_embedding_model_id()
+    ).save(str(path))
+    # Within the retry window the LLM fallback stays in place
+    assert intent_model.get_intent_classifier() is None
+
+    monkeypatch.setattr(intent_model, "LOAD_RETRY_SECONDS", 0)
+    classifier = intent_model.get_intent_classifier()
+    assert classifier is not None
+    assert classifier.labels == ["MEDICAL", "OTHER"]
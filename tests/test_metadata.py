@@ -0,0 +1,59 @@
+from contextlib import contextmanager
+from app.rag.metadata import METADATA_FIELDS, OFFSET_FIELDS, ensure_metadata_columns
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+
+class RecordingBind:
+    def __init__(self, columns, relations):
+        self.columns = columns
+        self.relations = relations
+        self.statements = []
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.statements.append(sql)
+        if "information_schema.columns" in sql:
+            return Result([(column,) for column in self.columns])
+        if sql.startswith("SELECT to_regclass"):
+            name = params["name"] if params else sql.split("'")[1]
+            return Result([(name,)] if name in self.relations else [])
+        return Result([])
+
+
+INDEXES = {"ix_documents_partition", "ix_langchain_pg_embedding_department", "ix_langchain_pg_embedding_doc_type"}
+
+
+def ddl(bind) -> list:
+    return [sql for sql in bind.statements if sql.startswith(("ALTER", "CREATE"))]
+
+
+def test_up_to_date_schema_issues_no_ddl():
+    bind = RecordingBind(("id", "content", "embedding") + METADATA_FIELDS + OFFSET_FIELDS,
+                         INDEXES | {"langchain_pg_embedding"})
+    ensure_metadata_columns(bind)
+
+    assert ddl(bind) == []
+
+
+def test_only_missing_columns_and_indexes_are_added():
+    bind = RecordingBind(("id", "content", "embedding") + METADATA_FIELDS, {"ix_documents_partition"})
+    ensure_metadata_columns(bind)
+
+    assert ddl(bind) == [
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS chunk_start integer",
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS chunk_end integer",
+    ]
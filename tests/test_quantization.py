@@ -0,0 +1,34 @@
+from app.rag.quantization import HNSW_EF_SEARCH_LIMIT, search_documents_binary
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append((str(statement), params or {}))
+        return []
+
+
+def test_binary_search_raises_ef_search_to_the_candidate_count_first():
+    db = RecordingSession()
+    search_documents_binary(db, [0.1, -0.2, 0.3], k=5, rerank_factor=40)
+
+    (set_sql, set_params), (search_sql, search_params) = db.statements
+    set_sql = " ".join(set_sql.split())
+    assert set_sql.startswith("SELECT set_config( 'hnsw.ef_search',")
+    # is_local = true keeps the raised ef_search inside the search's own transaction
+    assert set_sql.endswith("::text, true )")
+    assert set_params["candidates"] == 200
+    assert search_params["candidates"] == 200
+    assert "LIMIT :candidates" in search_sql
+
+
+def test_ef_search_is_capped_at_the_pgvector_limit():
+    db = RecordingSession()
+    search_documents_binary(db, [0.1, -0.2, 0.3], k=50, rerank_factor=100)
+
+    set_sql, set_params = db.statements[0]
+    assert "LEAST(" in set_sql
+    assert set_params["candidates"] == 5000
+    assert set_params["limit"] == HNSW_EF_SEARCH_LIMIT